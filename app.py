@@ -12,17 +12,26 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
 import os
 import sqlite3
 from datetime import datetime, timedelta
 import json
+import math
+import csv
+import codecs
+import hashlib
 import uuid
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 from fpdf import FPDF
+from fpdf.errors import FPDFException
 import base64
 
 # Import security utilities
@@ -31,12 +40,39 @@ from security_utils import (
     rate_limit_check, log_security_event, validate_session_security,
     sanitize_form_input
 )
+from job_queue import JobQueue, JobWorker, PermanentJobError, create_jobs_table
+from migrations import add_column, migrate
+from db_utils import connect_db, get_db, get_read_db, init_app as init_db_app
+from audit_log import audit_log
+from session_activity import SessionActivityTracker
+from calculation_utils import (
+    build_criteria_matrix, copras_kernel, copras_kernel_segmented,
+    rank_descending, rank_descending_segmented, segment_starts,
+    SeasonCoprasState, copras_weight_sweep, rank_matrix_descending,
+    summarize_rank_distribution, weight_samples, weight_grid,
+    normalize_in_place, copras_scores_normalized, SeasonMatrixCache,
+    top_k_descending, top_k_descending_segmented,
+    MCDM_METHODS, score_methods, borda_consensus,
+    RankingResultCache, weight_hash, compact_frame, StreamingCopras
+)
 
 app = Flask(__name__)
 app.secret_key = 'nba_mvp_secret_key_2024'
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024  # 512MB max file size; uploads are ingested in chunks
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)  # Session timeout
+app.config['MVP_SCORES_TOP_N'] = None  # Store every ranked player; an int keeps only the top N per season
+app.config['MVP_COMPACT_BATCH'] = False  # Low-memory float32/categorical mode for batch recalculation
+app.config['UPLOAD_WORKERS'] = 2  # Background threads validating and ingesting uploaded CSVs
+app.config['JOB_BACKEND'] = 'thread'  # 'thread' runs queued jobs in this process; 'queue' leaves them to job_worker.py
+app.config['EXPORT_FOLDER'] = 'exports'  # PDF reports produced by background export jobs
+app.config['SESSION_ACTIVITY_FLUSH_SECONDS'] = 60  # Interval of bulk user_sessions.last_activity writes
+
+# Pooled per-request SQLite connections, returned to the pool on teardown
+init_db_app(app)
+
+# Write queued audit events before the process exits
+atexit.register(audit_log.close)
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -61,11 +97,48 @@ COPRA_MVP_WEIGHTS = {
 COPRA_BENEFIT_CRITERIA = [f"C{i}" for i in range(1, 10)] # C1 to C9 are benefits
 COPRA_COST_CRITERIA = ["C10", "C11"] # C10, C11 are costs
 
-def init_database():
-    """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect('nba_mvp.db')
-    cursor = conn.cursor()
+# Display labels for the COPRAS criteria
+COPRA_CRITERIA_LABELS = {
+    "C1": "Total Games",
+    "C2": "Minutes Played",
+    "C3": "FG%",
+    "C4": "Points",
+    "C5": "Rebounds",
+    "C6": "Assists",
+    "C7": "Steals",
+    "C8": "Blocks",
+    "C9": "Team Performance",
+    "C10": "Turnovers (Cost)",
+    "C11": "Personal Fouls (Cost)"
+}
+
+# Identity columns kept in compact-mode results (criteria columns are dropped)
+COMPACT_RESULT_COLUMNS = ['id', 'A', 'team', 'season']
+
+# Rows read per chunk when loading seasons in compact mode
+COMPACT_CHUNK_ROWS = 100_000
+
+# Bytes of an upload inspected to detect its encoding and delimiter
+CSV_SNIFF_BYTES = 64 * 1024
+
+# Encodings tried for uploads without a UTF-8 BOM, most specific first
+CSV_FALLBACK_ENCODINGS = ['utf-8', 'cp1252', 'latin-1']
+
+# Upload rows inserted per executemany batch (progress is updated per batch)
+INGEST_BATCH_ROWS = 5000
+
+# Upload columns holding percentages; both fractions (0.525) and percents (52.5) are accepted
+UPLOAD_PERCENT_COLUMNS = ['C3']
+UPLOAD_PERCENT_MAX = 100
+
+# Rows read per chunk by the out-of-core streaming calculation
+STREAM_CHUNK_ROWS = 50_000
+
+# Upper bound on weight vectors scored by one sensitivity sweep request
+MAX_SWEEP_VECTORS = 5000
 
+def create_tables(cursor):
+    """Schema migration 1: the application's tables"""
     # Users table for authentication
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -159,6 +232,28 @@ def init_database():
             FOREIGN KEY (player_id) REFERENCES players (id)
         )
     ''')
+    # Scores of every MCDM method (and the 'borda' consensus) per player
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mcdm_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id INTEGER,
+            season INTEGER,
+            method TEXT NOT NULL,
+            score REAL,
+            rank_position INTEGER,
+            calculated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (player_id) REFERENCES players (id)
+        )
+    ''')
+    # Season data versions, bumped whenever a season's player rows change
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS season_versions (
+            season INTEGER PRIMARY KEY,
+            data_version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
     # Upload sessions table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS upload_sessions (
@@ -191,7 +286,70 @@ def init_database():
         )
     ''')
 
-    conn.commit()
+    # Durable queue for uploads, batch recalculation and PDF exports
+    create_jobs_table(cursor)
+
+def add_upload_and_identity_columns(cursor):
+    """Schema migration 2: columns added to upload_sessions, file_uploads and players"""
+    # Result or error message of background upload jobs
+    add_column(cursor, 'upload_sessions', 'message', 'TEXT')
+
+    # Rejected-rows report of each upload
+    add_column(cursor, 'file_uploads', 'rejected_rows', 'INTEGER DEFAULT 0')
+    add_column(cursor, 'file_uploads', 'rejected_report_path', 'TEXT')
+
+    # Content hash and target season, used to skip re-uploads of identical files
+    add_column(cursor, 'file_uploads', 'content_sha256', 'TEXT')
+    add_column(cursor, 'file_uploads', 'season', 'INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_uploads_content_sha256 ON file_uploads(content_sha256)')
+
+    # Player identity (normalized name, team, season) and statistics hash for upserts
+    if add_column(cursor, 'players', 'name_key', 'TEXT'):
+        add_column(cursor, 'players', 'row_hash', 'INTEGER')
+        backfill_player_keys(cursor)
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_players_identity ON players(name_key, team, season)')
+
+def create_query_indexes(cursor):
+    """Schema migration 3: indexes for the season, rankings and dashboard queries"""
+    # Season queries join statistics on player_id; without this index the join
+    # scans the whole statistics table once per player
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_statistics_player_id ON statistics(player_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_players_season ON players(season)')
+
+    # Rankings pages read one season's scores in rank order; player_id serves
+    # joins from players to their scores
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_mvp_scores_season_rank ON mvp_scores(season, rank_position)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_mvp_scores_player_id ON mvp_scores(player_id)')
+
+    # Admin dashboard: sessions per user and the latest activity
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_user_active
+        ON user_sessions(user_id, is_active, last_activity)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_timestamp ON user_activity(timestamp)')
+
+    # Upload history and dashboard upload statistics per user
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_uploads_upload_order ON file_uploads(user_id, upload_order)')
+
+    # Indexes of the old init_file_storage.py schema that no query needs:
+    # the first is a prefix of idx_file_uploads_upload_order, the second only
+    # slows down activity logging
+    cursor.execute('DROP INDEX IF EXISTS idx_file_uploads_user_id')
+    cursor.execute('DROP INDEX IF EXISTS idx_user_activity_user_id')
+
+# Applied in order by init_database(); add new migrations at the end and
+# never change one that has been released
+SCHEMA_MIGRATIONS = [
+    (1, 'Create tables', create_tables),
+    (2, 'Add upload report, content hash and player identity columns', add_upload_and_identity_columns),
+    (3, 'Add indexes for season, rankings and dashboard queries', create_query_indexes),
+]
+
+def init_database():
+    """Bring the SQLite database up to the current schema version"""
+    conn = connect_db()
+    migrate(conn, SCHEMA_MIGRATIONS)
+    cursor = conn.cursor()
 
     # Create default admin user if it doesn't exist
     cursor.execute('SELECT COUNT(*) FROM users WHERE role = "admin"')
@@ -210,64 +368,58 @@ def init_database():
 
 # Authentication helper functions
 def log_user_activity(user_id, action_type, action_details=None, ip_address=None, user_agent=None):
-    """Log user activity to database"""
+    """Queue a user activity row; the audit log writer stores it in the next batch"""
     try:
-        conn = sqlite3.connect('nba_mvp.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO user_activity (user_id, action_type, action_details, ip_address, user_agent)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, action_type, action_details, ip_address, user_agent))
-        conn.commit()
-        conn.close()
+        audit_log.log(user_id, action_type, action_details, ip_address, user_agent)
     except Exception as e:
         print(f"Error logging user activity: {e}")
 
 def create_user_session(user_id, ip_address=None, user_agent=None):
     """Create a new user session"""
     session_id = str(uuid.uuid4())
+    conn = None
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO user_sessions (id, user_id, ip_address, user_agent)
             VALUES (?, ?, ?, ?)
         ''', (session_id, user_id, ip_address, user_agent))
         conn.commit()
-        conn.close()
         return session_id
     except Exception as e:
+        # Don't leave a failed write open on the shared connection
+        if conn:
+            conn.rollback()
         print(f"Error creating user session: {e}")
         return None
 
+# Last-activity times of sessions, kept in memory and written in bulk
+session_activity = SessionActivityTracker(flush_interval=app.config['SESSION_ACTIVITY_FLUSH_SECONDS'])
+atexit.register(session_activity.close)
+
 def update_session_activity(session_id):
-    """Update last activity time for a session"""
-    try:
-        conn = sqlite3.connect('nba_mvp.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE user_sessions
-            SET last_activity = CURRENT_TIMESTAMP
-            WHERE id = ? AND is_active = 1
-        ''', (session_id,))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Error updating session activity: {e}")
+    """Record activity for a session; the time is written at the next bulk flush"""
+    session_activity.touch(session_id)
 
 def end_user_session(session_id):
     """End a user session"""
+    conn = None
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        # Activity not flushed yet is stored together with the logout
+        last_activity = session_activity.discard(session_id)
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE user_sessions
-            SET logout_time = CURRENT_TIMESTAMP, is_active = 0
+            SET logout_time = CURRENT_TIMESTAMP, is_active = 0,
+                last_activity = COALESCE(?, last_activity)
             WHERE id = ?
-        ''', (session_id,))
+        ''', (last_activity, session_id))
         conn.commit()
-        conn.close()
     except Exception as e:
+        if conn:
+            conn.rollback()
         print(f"Error ending user session: {e}")
 
 def login_required(f):
@@ -324,90 +476,736 @@ def admin_restricted(f):
 class MVPCalculator:
     """MVP Decision Support System Calculator using COPRAS method"""
 
-    def __init__(self, weights=COPRA_MVP_WEIGHTS, benefit_criteria=COPRA_BENEFIT_CRITERIA, cost_criteria=COPRA_COST_CRITERIA):
+    def __init__(self, weights=COPRA_MVP_WEIGHTS, benefit_criteria=COPRA_BENEFIT_CRITERIA, cost_criteria=COPRA_COST_CRITERIA,
+                 compact=False):
         self.weights = weights
         self.benefit_criteria = benefit_criteria
         self.cost_criteria = cost_criteria
+        # Compact mode: float32 criteria matrix and results without criteria columns
+        self.compact = compact
+
+    @property
+    def all_criteria(self):
+        """Benefit criteria followed by cost criteria, in matrix column order"""
+        return self.benefit_criteria + self.cost_criteria
+
+    def weight_vector(self):
+        """Weights aligned with all_criteria as a float64 array"""
+        return np.array([self.weights[c] for c in self.all_criteria], dtype=np.float64)
+
+    @property
+    def matrix_dtype(self):
+        """Criteria matrix dtype: float32 in compact mode, float64 otherwise"""
+        return np.float32 if self.compact else np.float64
+
+    def results_frame(self, df, rows, scores, ranks):
+        """
+        Build the ranked results from the given row positions of df. Compact
+        mode keeps only the identity columns instead of copying every column.
+        """
+        if self.compact:
+            results_df = pd.DataFrame({
+                col: df[col].take(rows).reset_index(drop=True)
+                for col in COMPACT_RESULT_COLUMNS if col in df.columns
+            })
+        else:
+            results_df = df.iloc[rows].reset_index(drop=True)
+        results_df['final_score'] = scores
+        results_df['rank_position'] = ranks.astype(np.int32 if self.compact else int)
+        return results_df
 
-    def calculate_mvp_scores(self, df):
+    def calculate_mvp_scores(self, df, top_k=None):
+        """
+        Rank players with COPRAS using the vectorized NumPy kernel.
+        Returns the filtered rows of df sorted by 'final_score' (Qi) with
+        'rank_position' added, identical to the original pandas path.
+        With top_k only the leaders are selected and ranked (players tied
+        with the k-th score included) instead of sorting every player.
+        """
+        # --- COPRAS Steps 1-4: one criteria matrix, normalized and weighted in place ---
+        matrix = build_criteria_matrix(df, self.all_criteria, self.matrix_dtype)
+        kept_idx, qi = copras_kernel(matrix, self.weight_vector(), len(self.benefit_criteria))
+        del matrix
+
+        if len(kept_idx) == 0 and self.all_criteria:
+            columns = [c for c in COMPACT_RESULT_COLUMNS if c in df.columns] if self.compact else df.columns.tolist()
+            return pd.DataFrame(columns=columns + ['final_score', 'rank_position'])
 
+        # --- COPRAS Step 5: Rank Players ---
+        if top_k is None:
+            order, ranks = rank_descending(qi)
+        else:
+            order, ranks = top_k_descending(qi, top_k)
+        return self.results_frame(df, kept_idx[order], qi[order], ranks)
+
+    def calculate_mvp_scores_batch(self, df, season_column='season', top_k=None):
+        """
+        Rank players of several seasons in a single pass.
+        Each season is normalized against its own column totals and s_min, so
+        results per season are the same as calling calculate_mvp_scores on
+        that season alone. Returns rows sorted by season, then rank.
+        With top_k only the leaders of each season are returned.
+        """
+        seasons = df[season_column].to_numpy()
+        # load_season_data already returns rows ordered by season; avoid the copy then
+        if len(seasons) > 1 and (seasons[1:] < seasons[:-1]).any():
+            df = df.sort_values(season_column, kind='stable')
+            seasons = df[season_column].to_numpy()
+        starts = segment_starts(seasons)
+
+        matrix = build_criteria_matrix(df, self.all_criteria, self.matrix_dtype)
+        kept_idx, kept_segments, qi = copras_kernel_segmented(
+            matrix, self.weight_vector(), len(self.benefit_criteria), starts
+        )
+        del matrix
 
-        copras_df = df[['C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'C8', 'C9', 'C10', 'C11']].copy()
-        for col in copras_df.columns:
-            copras_df[col] = pd.to_numeric(copras_df[col], errors='coerce').fillna(0)
+        if top_k is None:
+            order, ranks = rank_descending_segmented(qi, kept_segments)
+        else:
+            order, ranks = top_k_descending_segmented(qi, kept_segments, top_k)
+        return self.results_frame(df, kept_idx[order], qi[order], ranks)
+
+    def calculate_mvp_scores_streaming(self, chunk_source, top_k=None, sink=None, season_column='season'):
+        """
+        Rank players out of core. chunk_source is a callable returning a new
+        iterator of calculator frames each time; it is scanned three times
+        (totals, s_min, scoring) so memory stays flat for any input size.
+        Each scored chunk (identity columns and 'final_score') is passed to
+        sink if given. With top_k the leaders of every season are kept in a
+        bounded buffer and returned ranked like calculate_mvp_scores_batch.
+        """
+        if top_k is None and sink is None:
+            raise ValueError('Streaming calculation needs top_k or a sink.')
+
+        stream = StreamingCopras(self.weight_vector(), len(self.benefit_criteria))
+
+        def scan():
+            for chunk in chunk_source():
+                groups = chunk[season_column].to_numpy() if season_column in chunk.columns else None
+                yield chunk, build_criteria_matrix(chunk, self.all_criteria, self.matrix_dtype), groups
+
+        for _, matrix, groups in scan():
+            stream.add_totals(matrix, groups)
+        for _, matrix, groups in scan():
+            stream.add_s_min(matrix, groups)
+
+        leaders = {}
+        for chunk, matrix, groups in scan():
+            kept_idx, qi = stream.score(matrix, groups)
+            scored = pd.DataFrame({
+                col: chunk[col].take(kept_idx).reset_index(drop=True)
+                for col in COMPACT_RESULT_COLUMNS if col in chunk.columns
+            })
+            scored['final_score'] = qi
+            if sink is not None:
+                sink(scored)
+            if top_k is None:
+                continue
+
+            if season_column in scored.columns:
+                season_groups = scored.groupby(season_column, sort=False)
+            else:
+                season_groups = [(None, scored)]
+            for season, season_rows in season_groups:
+                candidates = pd.concat([leaders[season], season_rows]) if season in leaders else season_rows
+                order, _ = top_k_descending(candidates['final_score'].to_numpy(), top_k)
+                leaders[season] = candidates.iloc[order]
+
+        if top_k is None:
+            return None
+        if not leaders:
+            return pd.DataFrame(columns=COMPACT_RESULT_COLUMNS + ['final_score', 'rank_position'])
+
+        results = []
+        for season in sorted(leaders, key=lambda s: (s is None, s)):
+            season_df = leaders[season]
+            order, ranks = rank_descending(season_df['final_score'].to_numpy())
+            season_df = season_df.iloc[order].reset_index(drop=True)
+            season_df['rank_position'] = ranks.astype(int)
+            results.append(season_df)
+        return pd.concat(results, ignore_index=True)
+
+    def calculate_weight_sensitivity(self, df, weight_matrix):
+        """
+        Score every player under all weight vectors in weight_matrix
+        (criteria x K, rows in all_criteria order) at once and summarize
+        each player's rank distribution and stability.
+        Returns one row per player with 'id', 'A', 'team', 'baseline_rank'
+        (rank under self.weights) and the distribution statistics.
+        """
+        matrix = build_criteria_matrix(df, self.all_criteria)
+        qi = copras_weight_sweep(matrix, weight_matrix, len(self.benefit_criteria))
+        stats = summarize_rank_distribution(rank_matrix_descending(qi))
+
+        baseline = self.calculate_mvp_scores(df).set_index('id')['rank_position']
+        players = df[['id', 'A', 'team']].reset_index(drop=True)
+        players['baseline_rank'] = players['id'].map(baseline).astype('Int64')
+
+        return pd.concat([players, stats], axis=1)
+
+    def calculate_method_scores(self, df, methods=None, consensus=True):
+        """
+        Score players with several registered MCDM methods from a single
+        decision matrix. Returns one row per ranked player and method with
+        'id', 'method', 'score' and 'rank_position', sorted by method then
+        rank. With consensus a 'borda' method combining all ranks is added.
+        """
+        methods = list(methods or MCDM_METHODS)
+        matrix = build_criteria_matrix(df, self.all_criteria)
+        scores, ranks = score_methods(matrix, self.weight_vector(), len(self.benefit_criteria), methods)
+
+        if consensus:
+            points, consensus_ranks = borda_consensus(ranks)
+            scores = np.column_stack([scores, points])
+            ranks = np.column_stack([ranks, consensus_ranks])
+            methods.append('borda')
+
+        ids = df['id'].to_numpy()
+        frames = []
+        for k, method in enumerate(methods):
+            ranked = np.flatnonzero(~np.isnan(ranks[:, k]))
+            ranked = ranked[np.argsort(ranks[ranked, k], kind='stable')]
+            frames.append(pd.DataFrame({
+                'id': ids[ranked],
+                'method': method,
+                'score': scores[ranked, k],
+                'rank_position': ranks[ranked, k].astype(int)
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+
+# Fetch player data and map DB column names to 'C' criteria for MVPCalculator.
+# 'p.name AS A' maps player name to 'A' as expected by the calculator.
+# 's.games AS C1' etc., map statistics to C1-C11.
+SEASON_DATA_QUERY = '''
+    SELECT p.id, p.name AS A, p.team, p.season,
+           s.games AS C1, s.minutes AS C2, s.fg_percent AS C3,
+           s.points AS C4, s.rebounds AS C5, s.assists AS C6,
+           s.steals AS C7, s.blocks AS C8, s.team_performance AS C9,
+           s.turnovers AS C10, s.personal_fouls AS C11
+    FROM players p
+    JOIN statistics s ON p.id = s.player_id
+'''
+
+def season_data_query(seasons=None):
+    """Build the season data query and its parameters, ordered by season"""
+    query = SEASON_DATA_QUERY
+    params = []
+    if seasons is not None:
+        placeholders = ','.join(['?' for _ in seasons])
+        query += f' WHERE p.season IN ({placeholders})'
+        params = list(seasons)
+    return query + ' ORDER BY p.season, p.id', params
+
+def load_season_data(conn, seasons=None, compact=False):
+    """
+    Load player statistics for the given seasons (all seasons if None)
+    with a single query, ordered by season.
+    With compact the rows are read in chunks that are downcast as they
+    arrive (see compact_frame), so the full object-dtype frame never exists.
+    """
+    query, params = season_data_query(seasons)
+    if not compact:
+        return pd.read_sql_query(query, conn, params=params)
+
+    criteria = COPRA_BENEFIT_CRITERIA + COPRA_COST_CRITERIA
+    chunks = [compact_frame(chunk, criteria) for chunk in
+              pd.read_sql_query(query, conn, params=params, chunksize=COMPACT_CHUNK_ROWS)]
+    if not chunks:
+        return compact_frame(pd.read_sql_query(query, conn, params=params), criteria)
+
+    for col in ('A', 'team'):
+        # Give every chunk the same categories so concat keeps them categorical
+        categories = union_categoricals([chunk[col] for chunk in chunks]).categories
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+def db_chunk_source(seasons=None, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Chunk source over the statistics tables for streaming calculations.
+    Every call opens a new cursor, so the source can be scanned repeatedly.
+    """
+    def chunks():
+        conn = connect_db()
+        try:
+            query, params = season_data_query(seasons)
+            yield from pd.read_sql_query(query, conn, params=params, chunksize=chunk_rows)
+        finally:
+            conn.close()
+    return chunks
 
-        all_criteria = self.benefit_criteria + self.cost_criteria
+def csv_chunk_source(file_path, season=None, chunk_rows=STREAM_CHUNK_ROWS, encoding='utf-8'):
+    """
+    Chunk source over a CSV in the upload format ('A', 'Team', 'C1'-'C11')
+    for streaming calculations. Rows are numbered from 1 as their 'id' and
+    tagged with season when given.
+    """
+    def chunks():
+        next_id = 1
+        for chunk in pd.read_csv(file_path, chunksize=chunk_rows, encoding=encoding, skipinitialspace=True):
+            missing = [col for col in ['A', 'Team'] + COPRA_BENEFIT_CRITERIA + COPRA_COST_CRITERIA
+                       if col not in chunk.columns]
+            if missing:
+                raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+            chunk = chunk.rename(columns={'Team': 'team'})
+            chunk.insert(0, 'id', np.arange(next_id, next_id + len(chunk)))
+            next_id += len(chunk)
+            if season is not None:
+                chunk['season'] = season
+            yield chunk
+    return chunks
+
+def save_mvp_scores(cursor, results_df, seasons, top_n=None):
+    """
+    Replace stored MVP scores for the given seasons with the rows of
+    results_df (which must carry 'id', 'season', 'final_score' and
+    'rank_position'). With top_n only rows ranked top_n or better are
+    stored. The caller owns the transaction.
+    """
+    if top_n is not None:
+        results_df = results_df[results_df['rank_position'] <= top_n]
+    placeholders = ','.join(['?' for _ in seasons])
+    cursor.execute(f'DELETE FROM mvp_scores WHERE season IN ({placeholders})', list(seasons))
+    cursor.executemany('''
+        INSERT INTO mvp_scores
+        (player_id, season, normalized_score, final_score, rank_position)
+        VALUES (?, ?, 0.0, ?, ?)
+    ''', zip(
+        results_df['id'].astype(int).tolist(),             # Player ID from the original data
+        results_df['season'].astype(int).tolist(),         # Season being calculated
+        results_df['final_score'].astype(float).tolist(),  # The COPRAS Qi value
+        results_df['rank_position'].astype(int).tolist()   # The calculated rank
+    ))
+
+def save_method_scores(cursor, results_df, season):
+    """
+    Replace the stored scores of the methods present in results_df (the
+    calculate_method_scores layout) for one season. The caller owns the
+    transaction.
+    """
+    methods = results_df['method'].unique().tolist()
+    placeholders = ','.join(['?' for _ in methods])
+    cursor.execute(f'DELETE FROM mcdm_scores WHERE season = ? AND method IN ({placeholders})',
+                   [season] + methods)
+    cursor.executemany('''
+        INSERT INTO mcdm_scores (player_id, season, method, score, rank_position)
+        VALUES (?, ?, ?, ?, ?)
+    ''', zip(
+        results_df['id'].astype(int).tolist(),
+        [season] * len(results_df),
+        results_df['method'].tolist(),
+        results_df['score'].astype(float).tolist(),
+        results_df['rank_position'].astype(int).tolist()
+    ))
+
+def calculate_mvp_batch(seasons=None):
+    """
+    Recalculate MVP rankings for several seasons (all seasons if None)
+    with one read, one calculator pass and one write transaction.
+    Seasons whose stored rankings are already up to date are skipped.
+    Returns a dict with the number of ranked players per season.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    query = 'SELECT DISTINCT season FROM players'
+    params = []
+    if seasons is not None:
+        query += f" WHERE season IN ({','.join(['?' for _ in seasons])})"
+        params = list(seasons)
+    cursor.execute(query + ' ORDER BY season', params)
+
+    cache_keys = {row[0]: ranking_cache_key(row[0], get_season_version(cursor, row[0]))
+                  for row in cursor.fetchall()}
+    ranked = {season: ranking_result_cache.get(key) for season, key in cache_keys.items()}
+    stale_seasons = [season for season, count in ranked.items() if count is None]
+    if not stale_seasons:
+        return ranked
+
+    compact = app.config['MVP_COMPACT_BATCH']
+    df = load_season_data(conn, stale_seasons, compact=compact)
+    top_n = app.config['MVP_SCORES_TOP_N']
+    calculator = MVPCalculator(compact=compact)
+    results_df = calculator.calculate_mvp_scores_batch(df, top_k=top_n)
+
+    # Seasons whose players were all filtered out still get their old scores cleared
+    try:
+        save_mvp_scores(cursor, results_df, stale_seasons, top_n=top_n)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    ranked_counts = results_df['season'].value_counts()
+    for season in stale_seasons:
+        discard_season_state(season)
+        ranked[season] = int(ranked_counts.get(season, 0))
+        ranking_result_cache.put(cache_keys[season], ranked[season])
+    return ranked
+
+def get_season_version(cursor, season):
+    """Get the current data version of a season (0 if never changed)"""
+    cursor.execute('SELECT data_version FROM season_versions WHERE season = ?', (season,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def bump_season_version(cursor, season):
+    """Increment a season's data version inside the caller's transaction"""
+    cursor.execute('''
+        INSERT INTO season_versions (season, data_version) VALUES (?, 1)
+        ON CONFLICT(season) DO UPDATE
+        SET data_version = data_version + 1, updated_at = CURRENT_TIMESTAMP
+    ''', (season,))
+    return get_season_version(cursor, season)
 
-        normalized_df = copras_df.copy()
-        for col_name_c in all_criteria:
-            col_total = copras_df[col_name_c].sum()
-            normalized_df[f"normalized_{col_name_c}"] = copras_df[col_name_c] / col_total if col_total != 0 else 0
+# Ranked player counts of the COPRAS rankings currently stored in mvp_scores
+ranking_result_cache = RankingResultCache(max_entries=64)
 
-        weighted_df = normalized_df.copy()
-        for col_name_c in all_criteria:
+def ranking_cache_key(season, data_version, calculator=None):
+    """
+    Result cache key of a season's stored COPRAS ranking: season, data
+    version, weight vector hash and method, plus the storage top N.
+    """
+    calculator = calculator or MVPCalculator()
+    return (season, data_version, weight_hash(calculator.weight_vector()), 'copras',
+            app.config['MVP_SCORES_TOP_N'])
+
+# Cached COPRAS matrix and scores per season, keyed by season
+season_score_states = {}
+season_states_lock = threading.Lock()
+
+def discard_season_state(season):
+    """Drop the cached COPRAS state of a season"""
+    with season_states_lock:
+        season_score_states.pop(season, None)
+
+def build_season_state(conn, season):
+    """Build the cached COPRAS state of a season from the database"""
+    df = load_season_data(conn, [season])
+    calculator = MVPCalculator()
+    return SeasonCoprasState(
+        df['id'].to_numpy(),
+        build_criteria_matrix(df, calculator.all_criteria),
+        calculator.weight_vector(),
+        len(calculator.benefit_criteria)
+    )
 
-            weighted_df[f"weighted_{col_name_c}"] = weighted_df[f"normalized_{col_name_c}"] * self.weights[col_name_c]
+def refresh_season_scores(season, previous_version, inserted_ids=(), updated_ids=(), deleted_ids=()):
+    """
+    Rescore and replace stored MVP scores after rows of a season changed.
+
+    Only seasons that already have rankings are touched. When the cached
+    state matches previous_version, the changed rows are applied to its
+    matrix instead of reloading the season; otherwise the state is rebuilt
+    from the database. Any changed row moves every player's Qi, so the
+    season is fully rescored and its mvp_scores are replaced in one bulk
+    delete and insert.
+    Returns 'cached' (cached matrix reused), 'rebuilt' (state reloaded) or
+    None when the season has no rankings.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM mvp_scores WHERE season = ? LIMIT 1', (season,))
+    if cursor.fetchone() is None:
+        discard_season_state(season)
+        return None
 
+    with season_states_lock:
+        state, version = season_score_states.get(season, (None, None))
+        current_version = get_season_version(cursor, season)
+
+        if state is not None and version == previous_version and current_version == previous_version + 1:
+            changed_ids = list(inserted_ids) + list(updated_ids)
+            if changed_ids:
+                rows = load_player_rows(conn, changed_ids)
+                state.upsert(rows['id'].to_numpy(), build_criteria_matrix(rows, MVPCalculator().all_criteria))
+            state.delete(list(deleted_ids))
+            state.score()
+            source = 'cached'
+        else:
+            state = build_season_state(conn, season)
+            source = 'rebuilt'
 
-        weighted_cols_for_filter = [f"weighted_{c}" for c in all_criteria]
+        try:
+            top_n = app.config['MVP_SCORES_TOP_N']
+            save_mvp_scores(cursor, state_results_frame(state, season), [season], top_n=top_n)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            season_score_states.pop(season, None)
+            raise
+
+        season_score_states[season] = (state, current_version)
+        top_n = app.config['MVP_SCORES_TOP_N']
+        ranked_count = len(state.results) if top_n is None else int((state.results['rank_position'] <= top_n).sum())
+        ranking_result_cache.put(ranking_cache_key(season, current_version), ranked_count)
+        return source
+
+# Weight-independent normalized matrices per season, keyed by data version
+season_matrix_cache = SeasonMatrixCache(max_seasons=16)
+
+def get_normalized_season(season):
+    """
+    Get the (players, normalized matrix) pair of a season, re-reading the
+    season from the database only when its data version has changed.
+    Returns (None, None) when the season has no data.
+    """
+    conn = get_db()
+    data_version = get_season_version(conn.cursor(), season)
+    cached = season_matrix_cache.get(season, data_version)
+    if cached is not None:
+        return cached
 
-        # Apply the filter directly to the main DataFrame `df` to keep 'A' and 'Team' aligned
-        # Also ensure to handle cases where weighted_cols_for_filter might be empty
-        if weighted_cols_for_filter:
-            # Check for columns that actually exist in weighted_df
-            actual_weighted_cols_for_filter = [col for col in weighted_cols_for_filter if col in weighted_df.columns]
+    df = load_season_data(conn, [season])
 
-            # Create a boolean mask from weighted_df for filtering
-            # Use .loc to ensure original index alignment for merging back
-            mask = (weighted_df[actual_weighted_cols_for_filter] >= 0.000001).all(axis=1)
+    if df.empty:
+        return None, None
 
-            # Apply the mask to the original df and the weighted_df to keep them synchronized
-            df = df.loc[mask].copy() # Filter original df
-            weighted_df = weighted_df.loc[mask].copy() # Filter weighted df
+    calculator = MVPCalculator()
+    normalized = normalize_in_place(build_criteria_matrix(df, calculator.all_criteria))
+    players = df[['id', 'A', 'team']].reset_index(drop=True)
+    season_matrix_cache.put(season, data_version, players, normalized)
+    return players, normalized
 
-            # If after filtering, df becomes empty, return an empty DataFrame or handle appropriately
-            if df.empty:
-                return pd.DataFrame(columns=df.columns.tolist() + ['final_score', 'rank_position'])
+def load_player_rows(conn, player_ids):
+    """Load the calculator rows of specific players"""
+    placeholders = ','.join(['?' for _ in player_ids])
+    query = SEASON_DATA_QUERY + f' WHERE p.id IN ({placeholders})'
+    return pd.read_sql_query(query, conn, params=[int(i) for i in player_ids])
 
+def state_results_frame(state, season):
+    """Convert the scores of a running state into the save_mvp_scores layout"""
+    results_df = state.results.reset_index().rename(columns={'player_id': 'id'})
+    results_df['season'] = season
+    return results_df
 
-        # --- COPRAS Step 3: Calculate Si+ and Si- ---
-        # Sum of weighted benefit criteria
-        weighted_benefit_cols = [f"weighted_{c}" for c in self.benefit_criteria]
-        actual_weighted_benefit_cols = [col for col in weighted_benefit_cols if col in weighted_df.columns]
-        weighted_df["Si+"] = weighted_df[actual_weighted_benefit_cols].sum(axis=1)
+def sniff_csv_format(file_path, sample_size=CSV_SNIFF_BYTES):
+    """
+    Detect the encoding and delimiter of a CSV file from its first bytes.
+    Returns (encoding, delimiter).
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_size)
 
-        # Sum of weighted cost criteria
-        weighted_cost_cols = [f"weighted_{c}" for c in self.cost_criteria]
-        actual_weighted_cost_cols = [col for col in weighted_cost_cols if col in weighted_df.columns]
-        weighted_df["Si-"] = weighted_df[actual_weighted_cost_cols].sum(axis=1)
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        encoding = CSV_FALLBACK_ENCODINGS[-1]  # latin-1 decodes any byte
+        for candidate in CSV_FALLBACK_ENCODINGS[:-1]:
+            try:
+                # final=False tolerates a multi-byte character cut off by the sample
+                codecs.getincrementaldecoder(candidate)().decode(sample, final=False)
+                encoding = candidate
+                break
+            except UnicodeDecodeError:
+                continue
 
-        # Rounding Si+ and Si- as in the example snippet
-        weighted_df["Si+"] = weighted_df["Si+"].round(5)
-        weighted_df["Si-"] = weighted_df["Si-"].round(5)
+    text = sample.decode(encoding, errors='ignore')
+    try:
+        delimiter = csv.Sniffer().sniff('\n'.join(text.splitlines()[:20]), delimiters=',;').delimiter
+    except csv.Error:
+        header = text.splitlines()[0] if text else ''
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+    return encoding, delimiter
 
-        # --- COPRAS Step 4: Calculate Qi ---
-        s_min = weighted_df["Si-"].min() # Minimum Si- across all alternatives
+def read_csv_sniffed(file_path):
+    """
+    Read a CSV in one pass with the C engine after sniffing its format.
+    Malformed lines are skipped and returned so they can be reported; only
+    files that contain such lines are re-read with the python engine.
+    Returns (df, skipped_lines) where skipped_lines holds the raw fields of
+    every skipped line, or (None, []) if the file is empty.
+    """
+    encoding, delimiter = sniff_csv_format(file_path)
+    options = {'sep': delimiter, 'skipinitialspace': True, 'skip_blank_lines': True}
+
+    # The sniffed encoding comes first; later ones only matter if it was
+    # wrong beyond the sniffed sample
+    encodings = [encoding] + CSV_FALLBACK_ENCODINGS[CSV_FALLBACK_ENCODINGS.index(encoding) + 1:] \
+        if encoding in CSV_FALLBACK_ENCODINGS else [encoding]
+    for candidate in encodings:
+        try:
+            try:
+                return pd.read_csv(file_path, encoding=candidate, engine='c', on_bad_lines='error', **options), []
+            except pd.errors.ParserError:
+                skipped_lines = []
+
+                def skip_line(fields):
+                    skipped_lines.append(fields)
+                    return None
+
+                df = pd.read_csv(file_path, encoding=candidate, engine='python', on_bad_lines=skip_line, **options)
+                return df, skipped_lines
+        except UnicodeDecodeError:
+            continue
+        except pd.errors.EmptyDataError:
+            return None, []
+    return None, []
+
+def prepare_upload_chunk(df):
+    """Strip column names in place. Values are checked by find_invalid_upload_rows"""
+    df.columns = df.columns.str.strip()
+    return df
+
+def validate_upload_frame(df):
+    """
+    Validate a parsed upload (or its first chunk) in place: strictly
+    require columns 'A', 'Team', 'C1' through 'C11' and nothing else, with
+    numeric data in every 'C' column. Returns an error message or None.
+    """
+    # Clean column names (remove leading/trailing spaces)
+    prepare_upload_chunk(df)
+
+    # Define the strictly required columns in the exact order for validation
+    required_columns = ['A', 'Team', 'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'C8', 'C9', 'C10', 'C11']
+
+    # Check if all required columns are present
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        return f"Missing required columns: {', '.join(missing_columns)}. Your CSV must contain all of: {', '.join(required_columns)}."
+
+    # Check for any extra columns not in the required list
+    extra_columns = [col for col in df.columns if col not in required_columns]
+    if extra_columns:
+        return f"Extra unsupported columns found: {', '.join(extra_columns)}. Your CSV must contain *only* the columns: {', '.join(required_columns)}."
+
+    # Check if a column is entirely non-numeric after coercion (all NaNs)
+    # and is not an empty series (which would also be all NaNs)
+    for col in CSV_TO_DB_COLUMNS:
+        if pd.to_numeric(df[col], errors='coerce').isnull().all() and not df[col].empty:
+            return f"Column '{col}' contains no valid numeric data or is entirely empty after conversion. All values are NaN."
+
+    # Check for minimum number of rows with valid data (excluding header)
+    if len(df) < 1:
+        return "CSV file is empty or contains no valid data rows after processing."
+    return None
+
+def count_csv_rows(file_path, block_size=1024 * 1024):
+    """Estimate the data rows of a CSV by counting newlines block by block"""
+    lines = 0
+    last_block = b''
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            lines += block.count(b'\n')
+            last_block = block
+    if last_block and not last_block.endswith(b'\n'):
+        lines += 1
+    return max(lines - 1, 0)  # Exclude the header
+
+class CsvUploadStream:
+    """
+    An upload read in fixed-size chunks so memory stays flat for any file
+    size. validate() reads and validates the first chunk; iterating then
+    yields every chunk with stripped column names.
 
-        # Avoid division by zero by replacing 0 in Si- with a very small number (epsilon)
-        weighted_df["Si-"] = weighted_df["Si-"].replace(0, np.finfo(float).eps)
+    Like read_csv_sniffed, chunks are read with the C engine and the
+    python engine only takes over (skipping rows already yielded) when a
+    malformed line is met. skipped_lines collects those lines as they go.
+    """
 
-        weighted_df["Qi"] = weighted_df["Si+"] + ((s_min * weighted_df["Si+"]) / weighted_df["Si-"])
+    def __init__(self, file_path, chunk_rows=INGEST_BATCH_ROWS):
+        self.file_path = file_path
+        self.chunk_rows = chunk_rows
+        self.skipped_lines = []
+        self._chunks = None
+        self._first = None
 
-        # --- COPRAS Step 5: Rank Players ---
-        # Merge Qi back to the original DataFrame and rank
-        # Use .set_index(df.index) to ensure proper alignment after filtering
-        results_df = df.copy()
-        results_df['final_score'] = weighted_df['Qi'].values # Assign Qi values directly by array to filtered df
+    def validate(self):
+        """Read and validate the first chunk. Returns (is_valid, message)"""
+        try:
+            self._chunks = self._read_chunks()
+            first = next(self._chunks, None)
+        except Exception as e:
+            return False, f"An unexpected error occurred during CSV validation: {str(e)}"
 
-        # Rank in descending order of Qi (higher Qi is better)
-        results_df = results_df.sort_values('final_score', ascending=False)
-        # 'method="min"' ensures tied ranks get the same minimum rank number
-        results_df['rank_position'] = results_df['final_score'].rank(ascending=False, method="min").astype(int)
+        if first is None or first.empty:
+            return False, "Unable to read CSV file with any supported encoding or format, or file is empty."
+        error = validate_upload_frame(first)
+        if error:
+            return False, error
+
+        self._first = first
+        return True, "CSV format is valid."
+
+    def __iter__(self):
+        if self._first is None:
+            raise ValueError('validate() must succeed before the upload is read.')
+        yield self._first
+        for chunk in self._chunks:
+            yield prepare_upload_chunk(chunk)
+
+    def _skip_line(self, fields):
+        self.skipped_lines.append(fields)
+        return None
 
-        # Reset index and drop the old index as in run_copras_model if that's desired for final output consistency
-        results_df = results_df.reset_index(drop=True)
+    def _read_chunks(self):
+        encoding, delimiter = sniff_csv_format(self.file_path)
+        encodings = [encoding] + CSV_FALLBACK_ENCODINGS[CSV_FALLBACK_ENCODINGS.index(encoding) + 1:] \
+            if encoding in CSV_FALLBACK_ENCODINGS else [encoding]
+        engine = 'c'
+        yielded = 0
 
-        return results_df
+        while True:
+            try:
+                reader = pd.read_csv(
+                    self.file_path, encoding=encodings[0], sep=delimiter, engine=engine,
+                    chunksize=self.chunk_rows, skipinitialspace=True, skip_blank_lines=True,
+                    on_bad_lines='error' if engine == 'c' else self._skip_line
+                )
+                to_skip = yielded
+                for chunk in reader:
+                    # After a restart, drop the rows that were already yielded
+                    if to_skip >= len(chunk):
+                        to_skip -= len(chunk)
+                        continue
+                    chunk = chunk.iloc[to_skip:]
+                    to_skip = 0
+                    yielded += len(chunk)
+                    yield chunk
+                return
+            except UnicodeDecodeError:
+                encodings.pop(0)
+                if not encodings:
+                    raise
+            except pd.errors.ParserError:
+                if engine == 'python':
+                    raise
+                engine = 'python'
+            except pd.errors.EmptyDataError:
+                return
+
+def parse_csv_upload(file_path):
+    """
+    Read and validate an uploaded CSV once, strictly requiring columns 'A',
+    'Team', 'C1' through 'C11' and nothing else.
+    Returns (df, message): the validated frame with stripped column names and
+    numeric 'C1'-'C11' columns, or (None, error message). The frame is passed
+    straight to process_csv_data so the file is not parsed twice.
+    """
+    try:
+        # Sniff encoding and delimiter, then read the file once with the C engine
+        df, skipped_lines = read_csv_sniffed(file_path)
+
+        if df is None or df.empty:
+            return None, "Unable to read CSV file with any supported encoding or format, or file is empty."
+
+        error = validate_upload_frame(df)
+        if error:
+            return None, error
+
+        # Convert 'C1'-'C11', coercing non-numeric values to NaN
+        for col in CSV_TO_DB_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+        df.attrs['skipped_lines'] = skipped_lines
+        message = f"CSV format is valid. Found {len(df)} records with expected columns."
+        if skipped_lines:
+            message += f" Skipped {len(skipped_lines)} malformed lines."
+        return df, message
+
+    except Exception as e:
+        # Catch any unexpected errors during file reading or validation
+        return None, f"An unexpected error occurred during CSV validation: {str(e)}"
 
 
 def validate_csv_format(file_path):
@@ -415,136 +1213,276 @@ def validate_csv_format(file_path):
     Validate CSV format to strictly require columns 'A', 'Team', 'C1' through 'C11'
     and nothing else.
     """
-    try:
-        df = None
-        # Attempt to read CSV with various common encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-8-sig']
-
-        for encoding in encodings:
-            try:
-                # Try comma separator
-                df = pd.read_csv(
-                    file_path,
-                    encoding=encoding,
-                    sep=',',
-                    quoting=1,  # Quote all fields
-                    skipinitialspace=True,
-                    skip_blank_lines=True,
-                    on_bad_lines='skip',  # Skip lines that cause parsing errors
-                    engine='python'  # Robust parsing engine
-                )
-                break # Break if successful
-            except (UnicodeDecodeError, pd.errors.ParserError):
-                try:
-                    # Try semicolon separator if comma fails
-                    df = pd.read_csv(
-                        file_path,
-                        encoding=encoding,
-                        sep=';',
-                        quoting=1,
-                        skipinitialspace=True,
-                        skip_blank_lines=True,
-                        on_bad_lines='skip',
-                        engine='python'
-                    )
-                    break # Break if successful
-                except:
-                    continue # Continue to next encoding if both separators fail
-
-        if df is None or df.empty:
-            return False, "Unable to read CSV file with any supported encoding or format, or file is empty."
+    df, message = parse_csv_upload(file_path)
+    return df is not None, message
+
+
+# Strict mapping from CSV 'C' columns to statistics table columns
+CSV_TO_DB_COLUMNS = {
+    'C1': 'games',
+    'C2': 'minutes',
+    'C3': 'fg_percent',
+    'C4': 'points',
+    'C5': 'rebounds',
+    'C6': 'assists',
+    'C7': 'steals',
+    'C8': 'blocks',
+    'C9': 'team_performance', # C9 is now the 'ranking' from your preprocessing
+    'C10': 'turnovers',
+    'C11': 'personal_fouls'
+}
 
-        # Clean column names (remove leading/trailing spaces)
-        df.columns = df.columns.str.strip()
+def find_invalid_upload_rows(df):
+    """
+    Vectorized validation of an upload chunk: rows need a player name and
+    C1-C11 values that are numeric, not negative and, for percentage
+    columns, at most UPLOAD_PERCENT_MAX. Empty cells are allowed (stored
+    as 0). C1-C11 are converted to numeric in place.
 
-        # Define the strictly required columns in the exact order for validation
-        required_columns = ['A', 'Team', 'C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'C8', 'C9', 'C10', 'C11']
+    Returns a Series of rejection reasons ('; '-joined) for the invalid
+    rows, indexed like df, and the rejected rows with their original values.
+    """
+    names = df['A'].astype('string').str.strip()
+    checks = [((names.isna() | (names == '')).to_numpy(dtype=bool), 'missing player name')]
+
+    numeric = {}
+    for col in CSV_TO_DB_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce')
+        numeric[col] = values
+        checks.append(((df[col].notna() & values.isna()).to_numpy(), f'{col} is not numeric'))
+        checks.append(((values < 0).to_numpy(), f'{col} is negative'))
+        if col in UPLOAD_PERCENT_COLUMNS:
+            checks.append(((values > UPLOAD_PERCENT_MAX).to_numpy(), f'{col} is above {UPLOAD_PERCENT_MAX}'))
+
+    invalid = np.logical_or.reduce([mask for mask, _ in checks])
+    rejected = df.loc[invalid].copy()
+    for col, values in numeric.items():
+        df[col] = values
+
+    # Reasons are only assembled for the (usually few) rejected rows
+    reasons = [[] for _ in range(len(rejected))]
+    for mask, reason in checks:
+        for position in np.flatnonzero(mask[invalid]):
+            reasons[position].append(reason)
+    return pd.Series(['; '.join(row) for row in reasons], index=rejected.index, dtype=object), rejected
+
+# First column of the rejected-rows report. It counts parsed data rows
+# (1 = first row after the header), so blank lines and malformed lines
+# skipped by the python engine are not counted: it is not a file line number
+REJECTED_ROW_COLUMN = 'parsed_row'
+
+def write_rejected_rows(writer, rejected, reasons, row_numbers):
+    """Append rejected rows with their parsed row number and reasons to a csv writer"""
+    for row_number, values, reason in zip(row_numbers, rejected.values.tolist(), reasons.tolist()):
+        writer.writerow([row_number] + ['' if pd.isna(value) else value for value in values] + [reason])
+
+def player_name_keys(names):
+    """Normalize player names for matching: case-folded with single spaces"""
+    return names.str.casefold().str.split().str.join(' ')
+
+def statistics_row_hashes(stats):
+    """
+    Hash each row of C1-C11 values (float64, CSV_TO_DB_COLUMNS order, 0
+    for missing) into a signed 64-bit integer that SQLite can store.
+    """
+    hashes = pd.util.hash_pandas_object(stats.astype(np.float64).fillna(0.0), index=False)
+    return hashes.to_numpy().view(np.int64)
 
-        # Check if all required columns are present
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return False, f"Missing required columns: {', '.join(missing_columns)}. Your CSV must contain all of: {', '.join(required_columns)}."
+def backfill_player_keys(cursor):
+    """
+    Fill name_key and row_hash for existing players. Only the newest row of
+    each (normalized name, team, season) gets a key, so repeated uploads
+    from before keys existed do not block the unique index.
+    """
+    columns = ', '.join(f's.{column}' for column in CSV_TO_DB_COLUMNS.values())
+    cursor.execute(f'''
+        SELECT p.id, p.name, p.team, p.season, {columns}
+        FROM players p
+        LEFT JOIN statistics s ON s.player_id = p.id
+        ORDER BY p.id
+    ''')
+    rows = pd.DataFrame(cursor.fetchall(), columns=['id', 'name', 'team', 'season'] + list(CSV_TO_DB_COLUMNS.values()))
+    if rows.empty:
+        return
+
+    rows['name_key'] = player_name_keys(rows['name'].astype('string'))
+    rows['row_hash'] = statistics_row_hashes(rows[list(CSV_TO_DB_COLUMNS.values())])
+    newest = rows.drop_duplicates(['name_key', 'team', 'season'], keep='last')
+    cursor.executemany(
+        'UPDATE players SET name_key = ?, row_hash = ? WHERE id = ?',
+        zip(newest['name_key'].tolist(), newest['row_hash'].tolist(), newest['id'].tolist())
+    )
 
-        # Check for any extra columns not in the required list
-        extra_columns = [col for col in df.columns if col not in required_columns]
-        if extra_columns:
-            return False, f"Extra unsupported columns found: {', '.join(extra_columns)}. Your CSV must contain *only* the columns: {', '.join(required_columns)}."
+def create_upload_staging(cursor):
+    """
+    Create the per-connection TEMP staging table for an upload. It lives in
+    SQLite's temp database, so loading it never locks nba_mvp.db.
+    """
+    stat_columns = ', '.join(f'{column} REAL' for column in CSV_TO_DB_COLUMNS.values())
+    cursor.execute('DROP TABLE IF EXISTS temp.upload_staging')
+    cursor.execute(f'''
+        CREATE TEMP TABLE upload_staging (
+            row_number INTEGER PRIMARY KEY,
+            name TEXT,
+            team TEXT,
+            {stat_columns},
+            name_key TEXT,
+            row_hash INTEGER,
+            player_id INTEGER
+        )
+    ''')
 
-        # Validate numeric columns ('C1' through 'C11')
-        numeric_cols_to_validate = [f'C{i}' for i in range(1, 12)]
-        for col in numeric_cols_to_validate:
-            # Convert to numeric, coercing any non-numeric values to NaN
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+def stage_player_rows(cursor, df, first_row_number):
+    """
+    Bulk load a parsed chunk into upload_staging with executemany. Names and
+    teams are stripped, and missing or non-numeric statistics are staged as
+    NULL. Each row also gets its name_key and statistics row_hash.
+    Returns the number of staged rows.
+    """
+    names = df['A'].astype('string').str.strip()
+    teams = df['Team'].astype('string').str.strip()
+    stats = df[list(CSV_TO_DB_COLUMNS)].apply(pd.to_numeric, errors='coerce')
+
+    staged = pd.concat([names, teams, stats], axis=1).astype(object)
+    staged = staged.where(staged.notna(), None)
+    staged['name_key'] = player_name_keys(names).astype(object).where(names.notna(), None)
+    staged['row_hash'] = statistics_row_hashes(stats).tolist()
+    row_numbers = range(first_row_number, first_row_number + len(staged))
+
+    columns = ', '.join(['row_number', 'name', 'team'] + list(CSV_TO_DB_COLUMNS.values()) + ['name_key', 'row_hash'])
+    placeholders = ', '.join(['?'] * (len(CSV_TO_DB_COLUMNS) + 5))
+    cursor.executemany(
+        f'INSERT INTO temp.upload_staging ({columns}) VALUES ({placeholders})',
+        ([row_number] + row for row_number, row in zip(row_numbers, staged.values.tolist()))
+    )
+    return len(staged)
 
-            # Check if the column is entirely non-numeric after coercion (all NaNs)
-            # and is not an empty series (which would also be all NaNs)
-            if df[col].isnull().all() and not df[col].empty:
-                return False, f"Column '{col}' contains no valid numeric data or is entirely empty after conversion. All values are NaN."
+def validate_staged_rows(cursor):
+    """
+    Set-based validation of upload_staging: rows without a player name are
+    removed, empty teams become 'Unknown Team' and missing statistics 0.
+    When a player appears more than once in the file only the last row is
+    kept. Returns the number of rejected rows and of dropped duplicates.
+    """
+    cursor.execute("DELETE FROM temp.upload_staging WHERE name IS NULL OR name = ''")
+    rejected = cursor.rowcount
 
-        # Check for minimum number of rows with valid data (excluding header)
-        if len(df) < 1:
-            return False, "CSV file is empty or contains no valid data rows after processing."
+    cursor.execute("UPDATE temp.upload_staging SET team = 'Unknown Team' WHERE team IS NULL OR team = ''")
+    cursor.execute('UPDATE temp.upload_staging SET ' + ', '.join(
+        f'{column} = COALESCE({column}, 0.0)' for column in CSV_TO_DB_COLUMNS.values()))
 
-        return True, f"CSV format is valid. Found {len(df)} records with expected columns."
+    cursor.execute('''
+        DELETE FROM temp.upload_staging
+        WHERE row_number NOT IN (
+            SELECT MAX(row_number) FROM temp.upload_staging GROUP BY name_key, team
+        )
+    ''')
+    return rejected, cursor.rowcount
 
-    except Exception as e:
-        # Catch any unexpected errors during file reading or validation
-        return False, f"An unexpected error occurred during CSV validation: {str(e)}"
+def publish_staged_rows(cursor, season):
+    """
+    Upsert upload_staging into players and statistics in one short write
+    transaction opened here (the caller commits). Staged rows are matched to
+    the season's players on (name_key, team): rows with an unchanged
+    row_hash are skipped, changed rows have their statistics rewritten and
+    new rows are copied with INSERT ... SELECT, their ids allocated as one
+    contiguous block from the AUTOINCREMENT sequence.
+    Returns (inserted_ids, updated_ids, unchanged_count).
+    """
+    # Take the write lock before matching and reading the next id, so
+    # ingestion running in another process cannot race this upsert
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('''
+        UPDATE temp.upload_staging
+        SET player_id = (
+            SELECT p.id FROM players p
+            WHERE p.name_key = upload_staging.name_key AND p.team = upload_staging.team AND p.season = ?
+        )
+    ''', (int(season),))
 
+    cursor.execute('''
+        DELETE FROM temp.upload_staging
+        WHERE player_id IS NOT NULL
+          AND row_hash = (SELECT p.row_hash FROM players p WHERE p.id = upload_staging.player_id)
+    ''')
+    unchanged = cursor.rowcount
+
+    cursor.execute('SELECT player_id FROM temp.upload_staging WHERE player_id IS NOT NULL ORDER BY player_id')
+    updated_ids = [row[0] for row in cursor.fetchall()]
+    columns = list(CSV_TO_DB_COLUMNS.values())
+    if updated_ids:
+        assignments = ', '.join(f'{column} = s.{column}' for column in columns)
+        cursor.execute(f'''
+            UPDATE statistics SET {assignments}
+            FROM temp.upload_staging s
+            WHERE statistics.player_id = s.player_id
+        ''')
+        cursor.execute('''
+            UPDATE players SET name = s.name, row_hash = s.row_hash
+            FROM temp.upload_staging s
+            WHERE players.id = s.player_id
+        ''')
 
-def process_csv_data(file_path, session_id):
+    cursor.execute('''
+        SELECT MAX(COALESCE((SELECT MAX(id) FROM players), 0),
+                   COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'players'), 0))
+    ''')
+    first_id = cursor.fetchone()[0] + 1
+
+    player_id = '? + ROW_NUMBER() OVER (ORDER BY row_number) - 1'
+    cursor.execute(f'''
+        INSERT INTO players (id, name, team, season, name_key, row_hash)
+        SELECT {player_id}, name, team, ?, name_key, row_hash FROM temp.upload_staging
+        WHERE player_id IS NULL
+    ''', (first_id, int(season)))
+    inserted = cursor.rowcount
+
+    cursor.execute(f'''
+        INSERT INTO statistics (player_id, {', '.join(columns)})
+        SELECT {player_id}, {', '.join(columns)} FROM temp.upload_staging
+        WHERE player_id IS NULL
+    ''', (first_id,))
+    return list(range(first_id, first_id + inserted)), updated_ids, unchanged
+
+def process_csv_data(file_path, session_id, df=None, chunks=None):
     """
     Process CSV data with strict column requirements ('A', 'Team', 'C1'-'C11')
     and store in the database.
     'A' column maps to player name, 'Team' to team name, 'C1' to 'C11' map to specific statistics.
+
+    Each INGEST_BATCH_ROWS batch is validated with find_invalid_upload_rows;
+    rejected rows go to a '<upload>_rejected.csv' report recorded on the
+    file_uploads row, the rest into a TEMP staging table. Progress is kept
+    in upload_sessions.processed_records per batch. The staged rows are
+    then normalized in SQL and upserted into players/statistics in one
+    short transaction, so readers never see a partial upload and only
+    new or changed players are written. Pass a validated CsvUploadStream as
+    chunks, or the frame returned by parse_csv_upload as df; otherwise the
+    file is streamed from disk.
     """
+    conn = None
+    report_file = None
+    report_path = os.path.splitext(file_path)[0] + '_rejected.csv'
     try:
-        df = None
-        # Attempt to read CSV with various common encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-8-sig']
-
-        for encoding in encodings:
-            try:
-                # Try comma separator
-                df = pd.read_csv(
-                    file_path,
-                    encoding=encoding,
-                    sep=',',
-                    quoting=1,
-                    skipinitialspace=True,
-                    skip_blank_lines=True,
-                    on_bad_lines='skip',
-                    engine='python'
-                )
-                break
-            except (UnicodeDecodeError, pd.errors.ParserError):
-                try:
-                    # Try semicolon separator
-                    df = pd.read_csv(
-                        file_path,
-                        encoding=encoding,
-                        sep=';',
-                        quoting=1,
-                        skipinitialspace=True,
-                        skip_blank_lines=True,
-                        on_bad_lines='skip',
-                        engine='python'
-                    )
-                    break
-                except:
-                    continue
-
-        if df is None or df.empty:
-            raise Exception("Unable to read CSV file, or file is empty.")
-
-        # Clean column names (remove leading/trailing spaces)
-        df.columns = df.columns.str.strip()
+        if chunks is not None:
+            total_records = count_csv_rows(file_path)
+        elif df is not None:
+            total_records = len(df)
+            chunks = (df.iloc[start:start + INGEST_BATCH_ROWS] for start in range(0, len(df), INGEST_BATCH_ROWS))
+        else:
+            chunks = CsvUploadStream(file_path)
+            is_valid, message = chunks.validate()
+            if not is_valid:
+                raise Exception(message)
+            total_records = count_csv_rows(file_path)
 
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = connect_db()
         cursor = conn.cursor()
 
-        total_records = len(df)
-        processed_records = 0
+        staged_records = 0
+        rows_read = 0
+        report_writer = None
+        rejected_records = 0
 
         # Update upload session status to 'processing' and set total records
         cursor.execute('''
@@ -552,115 +1490,273 @@ def process_csv_data(file_path, session_id):
             SET total_records = ?, status = 'processing'
             WHERE id = ?
         ''', (total_records, session_id))
-
-        # Define strict mapping from CSV 'C' columns to database column names
-        csv_to_db_col_map = {
-            'C1': 'games',
-            'C2': 'minutes',
-            'C3': 'fg_percent',
-            'C4': 'points',
-            'C5': 'rebounds',
-            'C6': 'assists',
-            'C7': 'steals',
-            'C8': 'blocks',
-            'C9': 'team_performance', # C9 is now the 'ranking' from your preprocessing
-            'C10': 'turnovers',
-            'C11': 'personal_fouls'
-        }
+        conn.commit()
 
         # Default values for attributes not present in the strict CSV format
         season = 2024 # Default season (can be user-defined in a form)
 
-        for index, row in df.iterrows():
-            try:
-                player_name = str(row['A']).strip() # Get player name from 'A' column
-                team_name = str(row['Team']).strip() # Get team name from 'Team' column
-
-                if not player_name: # Basic check for empty player name
-                    print(f"Skipping row {index+1}: Player name (column 'A') is empty.")
-                    continue
-                if not team_name: # Basic check for empty team name
-                    print(f"Skipping row {index+1}: Team name (column 'Team') is empty for player {player_name}.")
-                    team_name = "Unknown Team" # Fallback if team is empty
-
-                # Insert player into 'players' table
-                cursor.execute('''
-                    INSERT INTO players (name, team, season)
-                    VALUES (?, ?, ?)
-                ''', (player_name, team_name, int(season)))
-
-                player_id = cursor.lastrowid # Get the ID of the newly inserted player
-
-                # Helper for safe numeric conversion: converts value from CSV to float,
-                # returns default_val if it's NaN or conversion fails.
-                def safe_numeric_from_csv(value, default_val=0.0):
-                    try:
-                        return float(value) if pd.notna(value) else default_val
-                    except (ValueError, TypeError):
-                        return default_val
-
-                # Prepare statistics values from CSV 'C' columns for insertion
-                stats_for_db = {
-                    db_col: safe_numeric_from_csv(row[csv_col])
-                    for csv_col, db_col in csv_to_db_col_map.items()
-                }
-
-                # Insert statistics into 'statistics' table
-                cursor.execute('''
-                    INSERT INTO statistics
-                    (player_id, games, minutes, fg_percent, points, rebounds,
-                     assists, steals, blocks, turnovers, personal_fouls, team_performance)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    player_id,
-                    stats_for_db['games'],
-                    stats_for_db['minutes'],
-                    stats_for_db['fg_percent'],
-                    stats_for_db['points'],
-                    stats_for_db['rebounds'],
-                    stats_for_db['assists'],
-                    stats_for_db['steals'],
-                    stats_for_db['blocks'],
-                    stats_for_db['turnovers'],
-                    stats_for_db['personal_fouls'],
-                    stats_for_db['team_performance'] # C9 from CSV
-                ))
-
-                processed_records += 1
-
-                # Update progress in upload session (can be done less frequently for performance)
-                cursor.execute('''
-                    UPDATE upload_sessions
-                    SET processed_records = ?
-                    WHERE id = ?
-                ''', (processed_records, session_id))
-
-            except Exception as e:
-                # Log specific row processing errors
-                player_identifier = row['A'] if 'A' in row else f"row {index+1}"
-                print(f"Error processing data for player/row {player_identifier}: {e}")
-                # Consider adding more detailed error logging or storing problematic rows
-                continue # Continue to the next row even if one fails
-
-        # Mark upload session as 'completed'
+        # Stage batch by batch; only the progress update touches nba_mvp.db
+        create_upload_staging(cursor)
+        for chunk in chunks:
+            reasons, rejected = find_invalid_upload_rows(chunk)
+            if len(rejected):
+                if report_writer is None:
+                    report_file = open(report_path, 'w', newline='', encoding='utf-8')
+                    report_writer = csv.writer(report_file)
+                    report_writer.writerow([REJECTED_ROW_COLUMN] + list(rejected.columns) + ['reason'])
+                row_numbers = rows_read + 1 + np.flatnonzero(chunk.index.isin(rejected.index))
+                write_rejected_rows(report_writer, rejected, reasons, row_numbers)
+                rejected_records += len(rejected)
+                chunk = chunk.drop(index=rejected.index)
+            rows_read += len(chunk) + len(rejected)
+
+            staged_records += stage_player_rows(cursor, chunk, staged_records + 1)
+            conn.commit()
+
+            cursor.execute('''
+                UPDATE upload_sessions
+                SET processed_records = ?
+                WHERE id = ?
+            ''', (rows_read, session_id))
+            conn.commit()
+
+        if report_file:
+            report_file.close()
+        rejected_in_sql, duplicate_records = validate_staged_rows(cursor)
+        rejected_records += rejected_in_sql
+        conn.commit()
+
+        # Publish and mark upload session as 'completed' in one transaction
+        inserted_player_ids, updated_player_ids, unchanged_records = publish_staged_rows(cursor, season)
+        processed_records = len(inserted_player_ids) + len(updated_player_ids) + unchanged_records
         cursor.execute('''
             UPDATE upload_sessions
-            SET status = 'completed'
+            SET status = 'completed', total_records = ?, processed_records = ?
             WHERE id = ?
-        ''', (session_id,))
+        ''', (processed_records, processed_records, session_id))
+        cursor.execute('''
+            UPDATE file_uploads
+            SET rejected_rows = ?, rejected_report_path = ?, season = ?
+            WHERE session_id = ?
+        ''', (rejected_records, report_path if report_writer else None, season, session_id))
+
+        changed = bool(inserted_player_ids or updated_player_ids)
+        if changed:
+            previous_version = bump_season_version(cursor, season) - 1
 
         conn.commit()
         conn.close()
 
-        return True, f"Successfully processed {processed_records} records."
+        if changed:
+            ranking_result_cache.invalidate(season)
+
+            # Rescore already calculated rankings for this season with the new and changed rows
+            refresh_season_scores(season, previous_version,
+                                  inserted_ids=inserted_player_ids, updated_ids=updated_player_ids)
+
+        message = (f"Successfully processed {processed_records} records: {len(inserted_player_ids)} inserted, "
+                   f"{len(updated_player_ids)} updated, {unchanged_records} unchanged.")
+        if duplicate_records:
+            message += f" Ignored {duplicate_records} earlier duplicate rows of the same players."
+        if rejected_records:
+            message += f" Rejected {rejected_records} invalid rows; download the rejected-rows report from the upload history."
+        skipped_lines = getattr(chunks, 'skipped_lines', None) or (df.attrs.get('skipped_lines') if df is not None else None)
+        if skipped_lines:
+            message += f" Skipped {len(skipped_lines)} malformed lines."
+        return True, message
 
     except Exception as e:
         # Catch any high-level errors during data processing
-        if 'conn' in locals() and conn: # Ensure connection exists before trying to rollback
-            conn.rollback() # Rollback any partial changes
+        if report_file:
+            report_file.close()
+            os.remove(report_path)
+        if conn: # Ensure connection exists before trying to rollback
+            conn.rollback() # Nothing was published; the staging table goes with the connection
+            try:
+                conn.execute("UPDATE upload_sessions SET status = 'failed' WHERE id = ?", (session_id,))
+                conn.commit()
+            except sqlite3.Error as cleanup_error:
+                print(f"Error marking upload {session_id} as failed: {cleanup_error}")
             conn.close()
         return False, f"An error occurred during data processing: {str(e)}"
 
+# Uploads are validated and ingested off the request thread. SQLite takes
+# one writer at a time, so ingestion itself is serialized across workers.
+upload_executor = ThreadPoolExecutor(max_workers=app.config['UPLOAD_WORKERS'], thread_name_prefix='upload')
+ingest_lock = threading.Lock()
+
+def set_upload_session_status(session_id, status, message=None):
+    """Record the status and result message of an upload session"""
+    DatabaseSecurity.execute_query(
+        'UPDATE upload_sessions SET status = ?, message = ? WHERE id = ?',
+        (status, message, session_id)
+    )
+
+def get_upload_job(session_id):
+    """Return the progress of an upload session and its owner, or None"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT us.status, us.total_records, us.processed_records, us.message,
+               fu.user_id, fu.original_filename, fu.upload_order
+        FROM upload_sessions us
+        LEFT JOIN file_uploads fu ON fu.session_id = us.id
+        WHERE us.id = ?
+    ''', (session_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+
+    total_records = row[1] or 0
+    processed_records = row[2] or 0
+    if row[0] == 'completed':
+        progress = 100
+    elif total_records:
+        progress = min(99, int(processed_records * 100 / total_records))
+    else:
+        progress = 0
+
+    return {
+        'job_id': session_id,
+        'status': row[0],
+        'total_records': total_records,
+        'processed_records': processed_records,
+        'progress': progress,
+        'message': row[3],
+        'user_id': row[4],
+        'filename': row[5],
+        'upload_order': row[6]
+    }
+
+def run_upload_job(session_id, upload_id, user_id, file_path, original_filename,
+                   upload_order, ip_address=None, user_agent=None, final_attempt=True):
+    """
+    Validate and ingest a saved upload on a worker thread. Progress and the
+    outcome are recorded in upload_sessions for the status endpoint.
+    Unexpected errors are re-raised so the job queue retries the upload;
+    the saved file is kept until the final attempt has failed.
+    """
+    try:
+        set_upload_session_status(session_id, 'validating')
+        upload_stream = CsvUploadStream(file_path)
+        is_valid, message = upload_stream.validate()
+        if not is_valid:
+            os.remove(file_path)
+            set_upload_session_status(session_id, 'failed', f'Invalid CSV format: {message}')
+            update_file_processing_status(upload_id, 'failed')
+            DatabaseSecurity.safe_log_activity(
+                user_id, 'security_csv_validation_failed', message, ip_address, user_agent
+            )
+            return
+
+        set_upload_session_status(session_id, 'queued')
+        with ingest_lock:
+            success, result_message = process_csv_data(file_path, session_id, chunks=upload_stream)
+
+        if success:
+            update_file_processing_status(upload_id, 'processed')
+            set_upload_session_status(
+                session_id, 'completed',
+                f'Successfully uploaded and processed: {original_filename} (Upload #{upload_order}). {result_message}'
+            )
+            DatabaseSecurity.safe_log_activity(
+                user_id,
+                'csv_upload_success',
+                f'Successfully uploaded and processed: {original_filename} (Order: {upload_order})',
+                ip_address,
+                user_agent
+            )
+
+            # Clean up old uploads (keep latest 10)
+            cleanup_old_uploads(user_id, keep_latest=10)
+        else:
+            update_file_processing_status(upload_id, 'failed')
+            set_upload_session_status(session_id, 'failed', f'Error processing file: {result_message}')
+            DatabaseSecurity.safe_log_activity(
+                user_id, 'security_csv_processing_error', result_message, ip_address, user_agent
+            )
+
+    except Exception as e:
+        print(f"Upload job error: {e}")
+        if final_attempt:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            update_file_processing_status(upload_id, 'error')
+            set_upload_session_status(session_id, 'error', 'Upload system error. Please try again.')
+        else:
+            set_upload_session_status(session_id, 'queued', 'Upload hit an error and will be retried.')
+        raise
+
+def ingest_upload_job(payload, job):
+    """Job handler: validate and ingest an upload saved by /upload_csv"""
+    # Uploads are published atomically, so a retry after a crash only has
+    # to skip uploads that already finished (published or rejected)
+    upload_job = get_upload_job(payload['session_id'])
+    if upload_job is not None and upload_job['status'] not in ('completed', 'failed'):
+        run_upload_job(**payload, final_attempt=job['attempts'] >= job['max_attempts'])
+        upload_job = get_upload_job(payload['session_id'])
+    if upload_job is None:
+        # The upload was deleted while its job was queued; nothing to retry
+        return {'status': 'missing', 'message': 'Upload no longer exists.'}
+    return {'status': upload_job['status'], 'message': upload_job['message']}
+
+def calculate_mvp_batch_job(payload, job):
+    """Job handler: recalculate MVP rankings for the given (or all) seasons"""
+    ranked = calculate_mvp_batch(payload.get('seasons'))
+    return {
+        'seasons': {str(season): count for season, count in ranked.items()},
+        'total_players': sum(ranked.values())
+    }
+
+def export_rankings_job(payload, job):
+    """Job handler: render a season's rankings PDF into EXPORT_FOLDER"""
+    try:
+        season = int(payload['season'])
+        # Rendering errors (e.g. names the PDF font cannot encode) fail the same way every attempt
+        pdf_bytes = build_rankings_pdf(season)
+    except (KeyError, ValueError, FPDFException) as e:
+        raise PermanentJobError(f'Cannot export rankings: {e}') from e
+    os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
+    download_name = f'NBA_MVP_Rankings_{season}_COPRAS.pdf'
+    file_path = os.path.abspath(os.path.join(app.config['EXPORT_FOLDER'], f"{job['id']}.pdf"))
+    with open(file_path, 'wb') as f:
+        f.write(pdf_bytes)
+    return {'file_path': file_path, 'download_name': download_name}
+
+JOB_HANDLERS = {
+    'ingest_upload': ingest_upload_job,
+    'calculate_mvp_batch': calculate_mvp_batch_job,
+    'export_rankings_pdf': export_rankings_job,
+}
+
+job_queue = JobQueue('nba_mvp.db')
+
+def run_local_jobs():
+    """
+    Drain the job queue on a pool thread. Every run is a worker of its own
+    (host-pid-random id), so lease checks tell concurrent pool threads apart.
+    """
+    JobWorker(job_queue, JOB_HANDLERS, context=app.app_context).run(once=True)
+
+def resume_local_jobs():
+    """
+    At startup with the 'thread' backend, drain jobs left queued or leased
+    by a previous process instead of waiting for the next submit_job call.
+    """
+    if app.config['JOB_BACKEND'] == 'thread':
+        upload_executor.submit(run_local_jobs)
+
+def submit_job(job_type, payload, max_attempts=3):
+    """
+    Store a job in the durable queue and return its id. With the 'thread'
+    backend the web process drains the queue on its worker pool; with
+    'queue' the job waits for job_worker.py.
+    """
+    job_id = job_queue.enqueue(job_type, payload, max_attempts=max_attempts)
+    if app.config['JOB_BACKEND'] == 'thread':
+        upload_executor.submit(run_local_jobs)
+    return job_id
+
 @app.route('/')
 def index():
     """Main route - redirect to login or dashboard based on auth status"""
@@ -675,7 +1771,7 @@ def index():
 
 def dashboard_data():
     """Get dashboard data for authenticated users with file upload info"""
-    conn = sqlite3.connect('nba_mvp.db')
+    conn = get_read_db()
     cursor = conn.cursor()
 
     user_id = session.get('user_id')
@@ -751,8 +1847,6 @@ def dashboard_data():
     cursor.execute('SELECT DISTINCT season FROM players ORDER BY season DESC')
     seasons = [row[0] for row in cursor.fetchall()]
 
-    conn.close()
-
     return dashboard_stats, recent_uploads, seasons
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -901,7 +1995,7 @@ def dashboard():
 def admin_dashboard():
     """Admin dashboard with user management and analytics"""
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_read_db()
         cursor = conn.cursor()
 
         # Get user statistics
@@ -952,11 +2046,9 @@ def admin_dashboard():
         ''')
         all_users = cursor.fetchall()
 
-        conn.close()
-
         # Get NBA data statistics (existing functionality)
         try:
-            conn = sqlite3.connect('nba_mvp.db')
+            conn = get_read_db()
             cursor = conn.cursor()
 
             cursor.execute('SELECT COUNT(DISTINCT season) FROM players')
@@ -965,7 +2057,6 @@ def admin_dashboard():
             cursor.execute('SELECT COUNT(*) FROM players')
             total_players = cursor.fetchone()[0] if cursor.fetchone() else 0
 
-            conn.close()
         except:
             total_seasons = 0
             total_players = 0
@@ -1078,8 +2169,9 @@ def create_user():
 @admin_required
 def toggle_user_status(user_id):
     """Toggle user active status"""
+    conn = None
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
 
         # Get current user info
@@ -1088,20 +2180,17 @@ def toggle_user_status(user_id):
 
         if not user_info:
             flash('User not found', 'error')
-            conn.close()
             return redirect(url_for('admin_dashboard'))
 
         # Don't allow deactivating yourself
         if user_id == session['user_id']:
             flash('You cannot deactivate your own account', 'error')
-            conn.close()
             return redirect(url_for('admin_dashboard'))
 
         # Toggle status
         new_status = not user_info[1]
         cursor.execute('UPDATE users SET is_active = ? WHERE id = ?', (new_status, user_id))
         conn.commit()
-        conn.close()
 
         # Log activity
         action = 'activated' if new_status else 'deactivated'
@@ -1116,6 +2205,8 @@ def toggle_user_status(user_id):
         flash(f'User {user_info[0]} has been {action}', 'success')
 
     except Exception as e:
+        if conn:
+            conn.rollback()
         flash('Error updating user status', 'error')
         print(f"Toggle user status error: {e}")
 
@@ -1125,33 +2216,42 @@ def toggle_user_status(user_id):
 @login_required
 def upload_page():
     """Upload CSV page"""
-    return render_template('upload.html')
+    return render_template('upload.html', job_id=request.args.get('job'))
 
 @app.route('/upload_csv', methods=['POST'])
 @login_required
 @security_headers
 def upload_csv():
-    """Handle CSV file upload with user-specific file storage"""
-    if 'file' not in request.files:
-        flash('No file selected', 'error')
+    """
+    Save a CSV upload and queue it for background validation and ingestion.
+    JSON clients get the job id and status URL back; form posts are
+    redirected to the upload page, which polls the job.
+    """
+    wants_json = request.accept_mimetypes.best == 'application/json'
+
+    def reject(message, status_code=400):
+        if wants_json:
+            return jsonify({'error': message}), status_code
+        flash(message, 'error')
         return redirect(url_for('upload_page'))
 
+    if 'file' not in request.files:
+        return reject('No file selected')
+
     file = request.files['file']
     if file.filename == '':
-        flash('No file selected', 'error')
-        return redirect(url_for('upload_page'))
+        return reject('No file selected')
 
     # Validate file upload security
     is_valid_file, file_message = SecurityValidator.validate_file_upload(
         file,
         allowed_extensions=['csv'],
-        max_size_mb=16
+        max_size_mb=app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
     )
 
     if not is_valid_file:
         log_security_event('file_upload_rejected', file_message, session.get('user_id'))
-        flash(f'File upload rejected: {file_message}', 'error')
-        return redirect(url_for('upload_page'))
+        return reject(f'File upload rejected: {file_message}')
 
     # Use the safe filename from validation
     safe_filename = file_message
@@ -1168,17 +2268,36 @@ def upload_csv():
         stored_filename = create_stored_filename(user_id, upload_order, original_filename)
         file_path = os.path.join(user_dir, stored_filename)
 
-        # Save file to user directory
-        file.save(file_path)
-        file_size = os.path.getsize(file_path)
+        # Save file to user directory, hashing it on the way
+        file_size, content_sha256 = save_upload_with_hash(file, file_path)
 
-        # Validate CSV format
-        is_valid, message = validate_csv_format(file_path)
-        if not is_valid:
+        # Identical content was already imported; point at that upload instead
+        duplicate = find_duplicate_upload(content_sha256)
+        if duplicate:
             os.remove(file_path)
-            log_security_event('csv_validation_failed', message, user_id)
-            flash(f'Invalid CSV format: {message}', 'error')
-            return redirect(url_for('upload_page'))
+            own_upload = duplicate['user_id'] == user_id
+            if own_upload:
+                message = (f'{SecurityValidator.sanitize_user_input(original_filename)} is identical to upload '
+                           f'#{duplicate["upload_order"]} ({SecurityValidator.sanitize_user_input(duplicate["original_filename"])}); '
+                           'its data was not imported again.')
+            else:
+                # Another user's upload: say nothing about their file or job
+                message = (f'The data in {SecurityValidator.sanitize_user_input(original_filename)} '
+                           'has already been imported; it was not imported again.')
+            DatabaseSecurity.safe_log_activity(
+                user_id,
+                'csv_upload_duplicate',
+                f'Skipped duplicate upload: {original_filename} (same content as upload {duplicate["id"]})',
+                request.environ.get('REMOTE_ADDR'),
+                request.headers.get('User-Agent')
+            )
+            if wants_json:
+                if own_upload:
+                    return jsonify({'job_id': duplicate['session_id'], 'status': 'duplicate',
+                                    'duplicate_of': duplicate['id'], 'message': message})
+                return jsonify({'status': 'duplicate', 'message': message})
+            flash(message, 'success')
+            return redirect(url_for('data_management'))
 
         # Create upload session
         session_id = str(uuid.uuid4())
@@ -1190,39 +2309,30 @@ def upload_csv():
         # Save file upload record
         upload_id = save_file_upload_record(
             user_id, session_id, original_filename, stored_filename,
-            file_path, file_size, upload_order
+            file_path, file_size, upload_order, content_sha256
         )
 
         if not upload_id:
             raise Exception("Failed to save file upload record")
 
-        # Process data
-        success, result_message = process_csv_data(file_path, session_id)
-
-        if success:
-            # Update file status to processed
-            update_file_processing_status(upload_id, 'processed')
-
-            # Log successful upload
-            DatabaseSecurity.safe_log_activity(
-                user_id,
-                'csv_upload_success',
-                f'Successfully uploaded and processed: {original_filename} (Order: {upload_order})',
-                request.environ.get('REMOTE_ADDR'),
-                request.headers.get('User-Agent')
-            )
+        # Validate and process on a background worker
+        submit_job('ingest_upload', {
+            'session_id': session_id,
+            'upload_id': upload_id,
+            'user_id': user_id,
+            'file_path': file_path,
+            'original_filename': SecurityValidator.sanitize_user_input(original_filename),
+            'upload_order': upload_order,
+            'ip_address': request.environ.get('REMOTE_ADDR'),
+            'user_agent': request.headers.get('User-Agent')
+        })
 
-            # Clean up old uploads (keep latest 10)
-            cleanup_old_uploads(user_id, keep_latest=10)
+        status_url = url_for('upload_status', job_id=session_id)
+        if wants_json:
+            return jsonify({'job_id': session_id, 'status': 'pending', 'status_url': status_url}), 202
 
-            flash(f'Successfully uploaded and processed: {SecurityValidator.sanitize_user_input(original_filename)} (Upload #{upload_order})', 'success')
-        else:
-            # Update file status to failed
-            update_file_processing_status(upload_id, 'failed')
-            log_security_event('csv_processing_error', result_message, user_id)
-            flash(f'Error processing file: {SecurityValidator.sanitize_user_input(result_message)}', 'error')
-
-        return redirect(url_for('data_management'))
+        flash(f'Upload #{upload_order} queued for processing.', 'success')
+        return redirect(url_for('upload_page', job=session_id))
 
     except Exception as e:
         # Clean up file if exists
@@ -1234,16 +2344,26 @@ def upload_csv():
             update_file_processing_status(upload_id, 'error')
 
         log_security_event('upload_system_error', str(e), session.get('user_id'))
-        flash('Upload system error. Please try again.', 'error')
         print(f"Upload error: {e}")
-        return redirect(url_for('upload_page'))
+        return reject('Upload system error. Please try again.', 500)
+
+@app.route('/api/upload_status/<job_id>')
+@login_required
+def upload_status(job_id):
+    """Report the progress of a background upload job"""
+    job = get_upload_job(job_id)
+    if job is None or (job['user_id'] != session['user_id'] and session.get('user_role') != 'admin'):
+        return jsonify({'error': 'Upload job not found'}), 404
+
+    del job['user_id']
+    return jsonify(job)
 
 @app.route('/data_management')
 @login_required
 @admin_restricted
 def data_management():
     """Data management page with file upload tracking"""
-    conn = sqlite3.connect('nba_mvp.db')
+    conn = get_read_db()
     cursor = conn.cursor()
 
     # Get available seasons
@@ -1308,8 +2428,6 @@ def data_management():
         'avg_file_size_mb': round((stats[3] / (1024 * 1024)) if stats[3] else 0, 2)
     }
 
-    conn.close()
-
     return render_template('data_management.html',
                          seasons=seasons,
                          season_data=season_data,
@@ -1324,71 +2442,101 @@ def calculate_mvp(season):
     Calculates MVP rankings for a specific season using the COPRAS method
     and stores the results in the database.
     """
-    conn = sqlite3.connect('nba_mvp.db')
+    conn = get_db()
+    cursor = conn.cursor()
 
-    # Fetch player data and map DB column names to 'C' criteria for MVPCalculator.
-    # 'p.name AS A' maps player name to 'A' as expected by the calculator.
-    # 's.games AS C1' etc., map statistics to C1-C11.
-    query = f'''
-        SELECT p.id, p.name AS A, p.team,
-               s.games AS C1, s.minutes AS C2, s.fg_percent AS C3,
-               s.points AS C4, s.rebounds AS C5, s.assists AS C6,
-               s.steals AS C7, s.blocks AS C8, s.team_performance AS C9,
-               s.turnovers AS C10, s.personal_fouls AS C11
-        FROM players p
-        JOIN statistics s ON p.id = s.player_id
-        WHERE p.season = ?
-    '''
+    # Nothing changed since the stored rankings were calculated
+    calculator = MVPCalculator()
+    cache_key = ranking_cache_key(season, get_season_version(cursor, season), calculator)
+    if ranking_result_cache.get(cache_key) is not None:
+        flash(f'MVP rankings for season {season} are already up to date.', 'success')
+        return redirect(url_for('mvp_rankings', season=season))
 
-    df = pd.read_sql_query(query, conn, params=(season,))
+    df = load_season_data(conn, [season])
 
     if df.empty:
         flash(f'No data found for season {season} to calculate MVP rankings.', 'error')
-        conn.close()
         return redirect(url_for('data_management'))
 
-    # Instantiate MVPCalculator and perform the COPRAS calculation
-    calculator = MVPCalculator()
-    results_df = calculator.calculate_mvp_scores(df)
+    # Perform the COPRAS calculation
+    top_n = app.config['MVP_SCORES_TOP_N']
+    results_df = calculator.calculate_mvp_scores(df, top_k=top_n)
 
     # Save calculated results to the 'mvp_scores' table
-    cursor = conn.cursor()
-
     try:
-        # Clear any previous MVP calculations for this season to ensure fresh data
-        cursor.execute('DELETE FROM mvp_scores WHERE season = ?', (season,))
-
-        # Insert new calculations for each player
-        for _, row in results_df.iterrows():
-            cursor.execute('''
-                INSERT INTO mvp_scores
-                (player_id, season, normalized_score, final_score, rank_position)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                int(row['id']),        # Player ID from the original data
-                season,                # Season being calculated
-                0.0,                   # 'normalized_score' is a placeholder, as Qi is in final_score
-                float(row['final_score']), # The COPRAS Qi value
-                int(row['rank_position']) # The calculated rank
-            ))
+        # Clear any previous MVP calculations for this season and insert the new ones
+        save_mvp_scores(cursor, results_df, [season], top_n=top_n)
 
         conn.commit()
+        discard_season_state(season)
+        ranking_result_cache.put(cache_key, len(results_df))
         flash(f'MVP rankings calculated successfully for season {season} using COPRAS method!', 'success')
 
     except sqlite3.Error as e:
         conn.rollback() # Rollback on error
         flash(f'Database error during MVP calculation: {e}', 'error')
-    finally:
-        conn.close() # Always close the connection
 
     return redirect(url_for('mvp_rankings', season=season))
 
+@app.route('/calculate_mvp_all', methods=['POST'])
+@login_required
+@admin_restricted
+def calculate_mvp_all():
+    """Recalculates MVP rankings for every season in a single batch."""
+    if app.config['JOB_BACKEND'] == 'queue':
+        submit_job('calculate_mvp_batch', {'seasons': None})
+        flash('MVP recalculation for all seasons has been queued.', 'success')
+        return redirect(url_for('data_management'))
+
+    try:
+        ranked = calculate_mvp_batch()
+        if ranked:
+            flash(f'MVP rankings recalculated for {len(ranked)} seasons ({sum(ranked.values())} players) using COPRAS method!', 'success')
+        else:
+            flash('No season data found to calculate MVP rankings.', 'error')
+    except sqlite3.Error as e:
+        flash(f'Database error during batch MVP calculation: {e}', 'error')
+
+    return redirect(url_for('data_management'))
+
+@app.route('/api/calculate_mvp_batch', methods=['POST'])
+@login_required
+@admin_restricted
+def api_calculate_mvp_batch():
+    """
+    API endpoint to recalculate MVP rankings for several seasons at once.
+    Accepts an optional JSON body {"seasons": [2023, 2024]}; all seasons
+    are recalculated when omitted.
+    """
+    payload = request.get_json(silent=True) or {}
+    seasons = payload.get('seasons')
+
+    if seasons is not None:
+        if not isinstance(seasons, list) or not all(isinstance(s, int) for s in seasons):
+            return jsonify({'error': 'seasons must be a list of integers.'}), 400
+        if not seasons:
+            return jsonify({'error': 'Please select at least 1 season.'}), 400
+
+    if app.config['JOB_BACKEND'] == 'queue':
+        job_id = submit_job('calculate_mvp_batch', {'seasons': seasons})
+        return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+    try:
+        ranked = calculate_mvp_batch(seasons)
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Database error during batch MVP calculation: {e}'}), 500
+
+    return jsonify({
+        'seasons': {str(season): count for season, count in ranked.items()},
+        'total_players': sum(ranked.values())
+    })
+
 @app.route('/mvp_rankings/<int:season>')
 @login_required
 @admin_restricted
 def mvp_rankings(season):
     """Displays the top 10 MVP rankings for a given season."""
-    conn = sqlite3.connect('nba_mvp.db')
+    conn = get_read_db()
 
     # Fetch player details along with their COPRAS final score (Qi) and rank position
     query = '''
@@ -1406,21 +2554,21 @@ def mvp_rankings(season):
     cursor.execute(query, (season, season))
     top_players = cursor.fetchall() # Get all results
 
-    conn.close()
-
     if not top_players:
         flash(f"No MVP rankings found for season {season}. Please ensure data is uploaded and calculations are run.", 'info')
 
     return render_template('mvp_rankings.html',
                          season=season,
-                         top_players=top_players)
+                         top_players=top_players,
+                         weights=COPRA_MVP_WEIGHTS,
+                         criteria_labels=COPRA_CRITERIA_LABELS)
 
 @app.route('/player_comparison')
 @login_required
 @admin_restricted
 def player_comparison():
     """Renders the player comparison page."""
-    conn = sqlite3.connect('nba_mvp.db')
+    conn = get_db()
     cursor = conn.cursor()
 
     # Fetch all players available for comparison
@@ -1431,7 +2579,6 @@ def player_comparison():
     ''')
 
     players = cursor.fetchall()
-    conn.close()
 
     return render_template('player_comparison.html', players=players)
 
@@ -1445,7 +2592,7 @@ def compare_players():
     if len(player_ids) < 2:
         return jsonify({'error': 'Please select at least 2 players for comparison.'}), 400
 
-    conn = sqlite3.connect('nba_mvp.db')
+    conn = get_db()
 
     # Create placeholders for the IN clause in SQL query
     placeholders = ','.join(['?' for _ in player_ids])
@@ -1458,19 +2605,202 @@ def compare_players():
     '''
 
     df = pd.read_sql_query(query, conn, params=player_ids)
-    conn.close()
 
     # Convert DataFrame to a list of dictionaries for JSON response
     comparison_data = df.to_dict('records')
 
     return jsonify({'players': comparison_data})
 
+def is_non_negative_number(value):
+    """True for finite JSON numbers >= 0 (booleans, NaN and infinity are rejected)"""
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value) and value >= 0)
+
+def parse_weight_vectors(payload, calculator):
+    """
+    Build the (criteria x K) weight matrix for a sensitivity sweep from a
+    JSON payload holding one of:
+      'weights': list of {criterion: weight} dicts (missing criteria keep the base weight)
+      'grid':    {criterion: [scale factors]} cartesian grid around the base weights
+      'samples': number of random vectors around the base weights, with
+                 optional 'spread' (default 0.2) and 'seed'
+    Returns (weight_matrix, error_message).
+    """
+    criteria = calculator.all_criteria
+    base = calculator.weight_vector()
+
+    if 'weights' in payload:
+        vectors = payload['weights']
+        if not isinstance(vectors, list) or not vectors:
+            return None, 'weights must be a non-empty list of weight objects.'
+        if len(vectors) > MAX_SWEEP_VECTORS:
+            return None, f'At most {MAX_SWEEP_VECTORS} weight vectors are allowed.'
+        weight_matrix = np.repeat(base[:, None], len(vectors), axis=1)
+        for k, vector in enumerate(vectors):
+            if not isinstance(vector, dict) or any(c not in criteria for c in vector):
+                return None, f'Weight vector {k + 1} must only use criteria {", ".join(criteria)}.'
+            for criterion, weight in vector.items():
+                if not is_non_negative_number(weight):
+                    return None, f'Weight for {criterion} in vector {k + 1} must be a non-negative number.'
+                weight_matrix[criteria.index(criterion), k] = weight
+        return weight_matrix, None
+
+    if 'grid' in payload:
+        grid = payload['grid']
+        if not isinstance(grid, dict) or not grid or any(c not in criteria for c in grid):
+            return None, f'grid must map criteria ({", ".join(criteria)}) to lists of scale factors.'
+        if any(not isinstance(f, list) or not f or not all(is_non_negative_number(x) for x in f)
+               for f in grid.values()):
+            return None, 'Each grid entry must be a non-empty list of non-negative scale factors.'
+        if np.prod([len(f) for f in grid.values()]) > MAX_SWEEP_VECTORS:
+            return None, f'At most {MAX_SWEEP_VECTORS} weight vectors are allowed.'
+        return weight_grid(base, criteria, grid), None
+
+    samples = payload.get('samples', 1000)
+    spread = payload.get('spread', 0.2)
+    seed = payload.get('seed')
+    if not isinstance(samples, int) or isinstance(samples, bool) or not 1 <= samples <= MAX_SWEEP_VECTORS:
+        return None, f'samples must be an integer between 1 and {MAX_SWEEP_VECTORS}.'
+    if not is_non_negative_number(spread) or spread > 1:
+        return None, 'spread must be a number between 0 and 1.'
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        return None, 'seed must be a non-negative integer.'
+    return weight_samples(base, samples, spread, seed), None
+
+@app.route('/api/score_weights/<int:season>', methods=['POST'])
+@login_required
+@admin_restricted
+def score_weights(season):
+    """
+    API endpoint for what-if weight tuning: ranks a season with the given
+    weights using the cached normalized matrix. Nothing is stored.
+    Accepts {"weights": {criterion: weight}, "limit": 10}.
+    """
+    payload = request.get_json(silent=True) or {}
+    limit = payload.get('limit', 10)
+    if not isinstance(limit, int) or limit < 1:
+        return jsonify({'error': 'limit must be a positive integer.'}), 400
+
+    calculator = MVPCalculator()
+    weights = payload.get('weights', {})
+    if not isinstance(weights, dict) or any(c not in calculator.all_criteria for c in weights):
+        return jsonify({'error': f'weights must only use criteria {", ".join(calculator.all_criteria)}.'}), 400
+    if not all(is_non_negative_number(w) for w in weights.values()):
+        return jsonify({'error': 'Weights must be non-negative numbers.'}), 400
+
+    calculator = MVPCalculator(weights={**COPRA_MVP_WEIGHTS, **weights})
+    players, normalized = get_normalized_season(season)
+    if players is None:
+        return jsonify({'error': f'No data found for season {season}.'}), 404
+
+    kept_idx, qi = copras_scores_normalized(normalized, calculator.weight_vector(), len(calculator.benefit_criteria))
+    order, ranks = rank_descending(qi)
+    top = players.iloc[kept_idx[order[:limit]]]
+
+    return jsonify({
+        'season': season,
+        'ranked_players': int(len(kept_idx)),
+        'rankings': [
+            {'rank': int(rank), 'id': int(row.id), 'name': row.A, 'team': row.team, 'final_score': float(score)}
+            for row, rank, score in zip(top.itertuples(), ranks[:limit], qi[order[:limit]])
+        ]
+    })
+
+@app.route('/api/weight_sensitivity/<int:season>', methods=['POST'])
+@login_required
+@admin_restricted
+def weight_sensitivity(season):
+    """
+    API endpoint that scores a season under many weight vectors at once and
+    returns rank distributions, #1 frequencies and rank stability per player.
+    """
+    payload = request.get_json(silent=True) or {}
+    limit = payload.get('limit', 20)
+    if not isinstance(limit, int) or limit < 1:
+        return jsonify({'error': 'limit must be a positive integer.'}), 400
+
+    calculator = MVPCalculator()
+    weight_matrix, error = parse_weight_vectors(payload, calculator)
+    if error:
+        return jsonify({'error': error}), 400
+
+    conn = get_db()
+    df = load_season_data(conn, [season])
+
+    if df.empty:
+        return jsonify({'error': f'No data found for season {season}.'}), 404
+
+    summary = calculator.calculate_weight_sensitivity(df, weight_matrix)
+    summary = summary.sort_values(['mean_rank', 'baseline_rank'], na_position='last')
+
+    winners = summary.loc[summary['top1_share'] > 0].sort_values('top1_share', ascending=False)
+    players = summary.head(limit).rename(columns={'A': 'name'})
+    players = players.astype(object).where(players.notna(), None)
+
+    return jsonify({
+        'season': season,
+        'vectors': int(weight_matrix.shape[1]),
+        'winners': [
+            {'id': int(row.id), 'name': row.A, 'top1_share': round(float(row.top1_share), 4)}
+            for row in winners.itertuples()
+        ],
+        'players': players.to_dict('records')
+    })
+
+@app.route('/api/compare_methods/<int:season>', methods=['POST'])
+@login_required
+@admin_restricted
+def compare_methods(season):
+    """
+    API endpoint to rank a season with several MCDM methods at once and
+    store the results per method. The season is read once and all methods
+    share its decision matrix.
+    Accepts {"methods": ["copras", "topsis", ...], "consensus": true, "limit": 10}.
+    """
+    payload = request.get_json(silent=True) or {}
+    methods = payload.get('methods', list(MCDM_METHODS))
+    consensus = payload.get('consensus', True)
+    limit = payload.get('limit', 10)
+
+    if not isinstance(methods, list) or not methods or any(m not in MCDM_METHODS for m in methods):
+        return jsonify({'error': f'methods must be a non-empty list of {", ".join(MCDM_METHODS)}.'}), 400
+    if not isinstance(consensus, bool):
+        return jsonify({'error': 'consensus must be true or false.'}), 400
+    if not isinstance(limit, int) or limit < 1:
+        return jsonify({'error': 'limit must be a positive integer.'}), 400
+
+    conn = get_db()
+    df = load_season_data(conn, [season])
+    if df.empty:
+        return jsonify({'error': f'No data found for season {season}.'}), 404
+
+    results_df = MVPCalculator().calculate_method_scores(df, list(dict.fromkeys(methods)), consensus)
+
+    cursor = conn.cursor()
+    try:
+        save_method_scores(cursor, results_df, season)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        return jsonify({'error': f'Database error while storing method scores: {e}'}), 500
+
+    names = df.set_index('id')['A']
+    rankings = {}
+    for method, method_df in results_df.groupby('method', sort=False):
+        top = method_df[method_df['rank_position'] <= limit]
+        rankings[method] = [
+            {'rank': int(row.rank_position), 'id': int(row.id), 'name': names[row.id], 'score': float(row.score)}
+            for row in top.itertuples()
+        ]
+
+    return jsonify({'season': season, 'methods': list(rankings), 'rankings': rankings})
+
 @app.route('/delete_season/<int:season>', methods=['POST'])
 @login_required
 @admin_restricted
 def delete_season(season):
     """Deletes all player, statistics, and MVP score data for a specific season."""
-    conn = sqlite3.connect('nba_mvp.db')
+    conn = get_db()
     cursor = conn.cursor()
 
     try:
@@ -1479,6 +2809,7 @@ def delete_season(season):
         # 2. Delete statistics
         # 3. Delete players
         cursor.execute('DELETE FROM mvp_scores WHERE season = ?', (season,))
+        cursor.execute('DELETE FROM mcdm_scores WHERE season = ?', (season,))
         cursor.execute('''
             DELETE FROM statistics
             WHERE player_id IN (
@@ -1486,25 +2817,24 @@ def delete_season(season):
             )
         ''', (season,))
         cursor.execute('DELETE FROM players WHERE season = ?', (season,))
+        # Uploads of this season may be imported again once their data is gone
+        cursor.execute('UPDATE file_uploads SET content_sha256 = NULL WHERE season = ?', (season,))
+        bump_season_version(cursor, season)
 
         conn.commit() # Commit the changes to the database
+        discard_season_state(season)
+        ranking_result_cache.invalidate(season)
         flash(f'Successfully deleted all data for season {season}.', 'success')
 
     except sqlite3.Error as e:
         conn.rollback() # Rollback changes if any error occurs
         flash(f'Error deleting season data: {str(e)}', 'error')
 
-    finally:
-        conn.close() # Ensure connection is closed
-
     return redirect(url_for('data_management'))
 
-@app.route('/export_rankings/<int:season>')
-@login_required
-@admin_restricted
-def export_rankings(season):
-    """Exports the MVP rankings for a specified season to a PDF file."""
-    conn = sqlite3.connect('nba_mvp.db')
+def build_rankings_pdf(season):
+    """Render the MVP rankings for a season as PDF bytes."""
+    conn = get_read_db()
 
     # Fetch data required for the PDF report
     query = '''
@@ -1518,7 +2848,6 @@ def export_rankings(season):
     '''
 
     df = pd.read_sql_query(query, conn, params=(season, season))
-    conn.close()
 
     # Initialize FPDF object and add a page
     pdf = FPDF()
@@ -1552,12 +2881,17 @@ def export_rankings(season):
         pdf.cell(30, 8, f"{row['final_score']:.4f}", 1) # Format Qi score
         pdf.ln() # Move to the next line for the next row
 
+    # fpdf2 returns the document as bytes; the legacy fpdf package returns a latin-1 string
+    pdf_content = pdf.output(dest='S')
+    return pdf_content.encode('latin-1') if isinstance(pdf_content, str) else bytes(pdf_content)
+
+@app.route('/export_rankings/<int:season>')
+@login_required
+@admin_restricted
+def export_rankings(season):
+    """Exports the MVP rankings for a specified season to a PDF file."""
     # Save the PDF to an in-memory BytesIO object
-    pdf_output = BytesIO()
-    # Output PDF as a string and encode it to latin-1 (common for PDF)
-    pdf_content = pdf.output(dest='S').encode('latin-1')
-    pdf_output.write(pdf_content)
-    pdf_output.seek(0) # Rewind to the beginning of the BytesIO object
+    pdf_output = BytesIO(build_rankings_pdf(season))
 
     # Send the PDF file as an attachment
     return send_file(
@@ -1567,6 +2901,51 @@ def export_rankings(season):
         download_name=f'NBA_MVP_Rankings_{season}_COPRAS.pdf' # Suggested filename
     )
 
+@app.route('/api/export_rankings/<int:season>', methods=['POST'])
+@login_required
+@admin_restricted
+def api_export_rankings(season):
+    """Queue a PDF export of a season's rankings as a background job"""
+    job_id = submit_job('export_rankings_pdf', {'season': season})
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+@admin_restricted
+def job_status(job_id):
+    """Report the state of a background recalculation or export job"""
+    job = job_queue.get(job_id)
+    if job is None or job['job_type'] == 'ingest_upload':
+        return jsonify({'error': 'Job not found'}), 404
+
+    response = {key: job[key] for key in
+                ('id', 'job_type', 'status', 'attempts', 'max_attempts', 'last_error', 'created_at', 'finished_at')}
+    result = job['result'] or {}
+    if job['job_type'] == 'export_rankings_pdf':
+        if job['status'] == 'completed':
+            response['download_url'] = url_for('download_job_result', job_id=job_id)
+    else:
+        response['result'] = result
+    return jsonify(response)
+
+@app.route('/api/jobs/<job_id>/download')
+@login_required
+@admin_restricted
+def download_job_result(job_id):
+    """Download the PDF produced by a completed export job"""
+    job = job_queue.get(job_id)
+    if job is None or job['job_type'] != 'export_rankings_pdf' or job['status'] != 'completed':
+        return jsonify({'error': 'Export not available'}), 404
+    if not os.path.exists(job['result']['file_path']):
+        return jsonify({'error': 'Export file no longer exists'}), 410
+
+    return send_file(
+        job['result']['file_path'],
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=job['result']['download_name']
+    )
+
 # File management helper functions
 def get_user_upload_directory(user_id):
     """Get or create user-specific upload directory"""
@@ -1577,7 +2956,7 @@ def get_user_upload_directory(user_id):
 def get_next_upload_order(user_id):
     """Get the next upload order number for a user"""
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT COALESCE(MAX(upload_order), 0) + 1
@@ -1585,7 +2964,6 @@ def get_next_upload_order(user_id):
             WHERE user_id = ?
         ''', (user_id,))
         next_order = cursor.fetchone()[0]
-        conn.close()
         return next_order
     except Exception as e:
         print(f"Error getting next upload order: {e}")
@@ -1597,36 +2975,90 @@ def create_stored_filename(user_id, upload_order, original_filename):
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     return f"upload_{upload_order:04d}_{timestamp}{file_ext}"
 
+def save_upload_with_hash(file, file_path, block_size=1024 * 1024):
+    """
+    Write an uploaded file to disk block by block while hashing it.
+    Returns (file_size, sha256 hex digest).
+    """
+    digest = hashlib.sha256()
+    file_size = 0
+    file.stream.seek(0)
+    with open(file_path, 'wb') as out:
+        for block in iter(lambda: file.stream.read(block_size), b''):
+            digest.update(block)
+            out.write(block)
+            file_size += len(block)
+    return file_size, digest.hexdigest()
+
+def find_duplicate_upload(content_sha256):
+    """
+    Return the successfully processed upload with identical content as a
+    dict, or None. Uploads still in flight, failed or rejected do not
+    count, so a file can be uploaded again after a failed ingest (a second
+    upload while the first is still running is ingested as an unchanged
+    upsert). The lookup covers every user's uploads,
+    since the imported player data is shared; callers must not expose
+    another user's upload details.
+
+    Only file_uploads rows hold the hash, so once an upload is deleted
+    (by the user or by cleanup_old_uploads, which keeps the latest 10 per
+    user) the same file is imported again. That re-import is an upsert of
+    unchanged rows, so it costs time but does not duplicate players.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, session_id, original_filename, upload_order, status, user_id
+        FROM file_uploads
+        WHERE content_sha256 = ? AND status = 'processed'
+        ORDER BY id DESC
+        LIMIT 1
+    ''', (content_sha256,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        'id': row[0],
+        'session_id': row[1],
+        'original_filename': row[2],
+        'upload_order': row[3],
+        'status': row[4],
+        'user_id': row[5]
+    }
+
 def save_file_upload_record(user_id, session_id, original_filename, stored_filename,
-                          file_path, file_size, upload_order):
+                          file_path, file_size, upload_order, content_sha256=None):
     """Save file upload record to database"""
+    conn = None
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO file_uploads
             (user_id, session_id, original_filename, stored_filename,
-             file_path, file_size, upload_order, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'uploaded')
+             file_path, file_size, upload_order, status, content_sha256)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'uploaded', ?)
         ''', (user_id, session_id, original_filename, stored_filename,
-              file_path, file_size, upload_order))
+              file_path, file_size, upload_order, content_sha256))
         conn.commit()
         upload_id = cursor.lastrowid
-        conn.close()
         return upload_id
     except Exception as e:
+        if conn:
+            conn.rollback()
         print(f"Error saving file upload record: {e}")
         return None
 
 def get_user_uploads(user_id, limit=None):
     """Get user's upload history ordered by upload order"""
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
 
         query = '''
             SELECT id, original_filename, stored_filename, file_path,
-                   file_size, upload_order, status, created_at, processed_at
+                   file_size, upload_order, status, created_at, processed_at,
+                   rejected_rows, rejected_report_path
             FROM file_uploads
             WHERE user_id = ?
             ORDER BY upload_order DESC
@@ -1649,10 +3081,11 @@ def get_user_uploads(user_id, limit=None):
                 'upload_order': row[5],
                 'status': row[6],
                 'created_at': row[7],
-                'processed_at': row[8]
+                'processed_at': row[8],
+                'rejected_rows': row[9] or 0,
+                'rejected_report_path': row[10]
             })
 
-        conn.close()
         return uploads
     except Exception as e:
         print(f"Error getting user uploads: {e}")
@@ -1660,8 +3093,9 @@ def get_user_uploads(user_id, limit=None):
 
 def update_file_processing_status(upload_id, status, processed_at=None):
     """Update file processing status"""
+    conn = None
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
 
         if processed_at is None:
@@ -1673,14 +3107,16 @@ def update_file_processing_status(upload_id, status, processed_at=None):
             WHERE id = ?
         ''', (status, processed_at, upload_id))
         conn.commit()
-        conn.close()
         return True
     except Exception as e:
+        if conn:
+            conn.rollback()
         print(f"Error updating file processing status: {e}")
         return False
 
 def cleanup_old_uploads(user_id, keep_latest=10):
     """Clean up old upload files for a user, keeping only the latest N files"""
+    conn = None
     try:
         uploads = get_user_uploads(user_id)
         if len(uploads) <= keep_latest:
@@ -1689,24 +3125,26 @@ def cleanup_old_uploads(user_id, keep_latest=10):
         # Get files to delete (oldest ones)
         files_to_delete = uploads[keep_latest:]
 
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
 
         for file_record in files_to_delete:
-            # Delete physical file
-            if os.path.exists(file_record['file_path']):
-                try:
-                    os.remove(file_record['file_path'])
-                except OSError as e:
-                    print(f"Error deleting file {file_record['file_path']}: {e}")
+            # Delete physical file and its rejected-rows report
+            for path in (file_record['file_path'], file_record['rejected_report_path']):
+                if path and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        print(f"Error deleting file {path}: {e}")
 
             # Delete database record
             cursor.execute('DELETE FROM file_uploads WHERE id = ?', (file_record['id'],))
 
         conn.commit()
-        conn.close()
         return True
     except Exception as e:
+        if conn:
+            conn.rollback()
         print(f"Error cleaning up old uploads: {e}")
         return False
 
@@ -1731,7 +3169,7 @@ def download_upload(upload_id):
     """Download a user's uploaded file"""
     user_id = session['user_id']
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
         # Verify file belongs to user
         cursor.execute('''
@@ -1740,7 +3178,6 @@ def download_upload(upload_id):
             WHERE id = ? AND user_id = ?
         ''', (upload_id, user_id))
         result = cursor.fetchone()
-        conn.close()
         if not result:
             flash('File not found or access denied', 'error')
             return redirect(url_for('upload_history'))
@@ -1765,36 +3202,60 @@ def download_upload(upload_id):
         flash('Error downloading file', 'error')
         print(f"Download error: {e}")
         return redirect(url_for('upload_history'))
+
+@app.route('/download_rejected/<int:upload_id>')
+@login_required
+def download_rejected_rows(upload_id):
+    """Download the rejected-rows report of a user's upload"""
+    user_id = session['user_id']
+    conn = get_db()
+    cursor = conn.cursor()
+    # Verify file belongs to user
+    cursor.execute('''
+        SELECT original_filename, rejected_report_path
+        FROM file_uploads
+        WHERE id = ? AND user_id = ?
+    ''', (upload_id, user_id))
+    result = cursor.fetchone()
+    if not result or not result[1] or not os.path.exists(result[1]):
+        flash('No rejected-rows report for this upload', 'error')
+        return redirect(url_for('upload_history'))
+    original_filename, report_path = result
+    return send_file(os.path.abspath(report_path),
+                    as_attachment=True,
+                    download_name=f'{os.path.splitext(original_filename)[0]}_rejected.csv',
+                    mimetype='text/csv')
+
 @app.route('/delete_upload/<int:upload_id>', methods=['POST'])
 @login_required
 def delete_upload(upload_id):
     """Delete a user's uploaded file"""
     user_id = session['user_id']
+    conn = None
     try:
-        conn = sqlite3.connect('nba_mvp.db')
+        conn = get_db()
         cursor = conn.cursor()
         # Verify file belongs to user
         cursor.execute('''
-            SELECT original_filename, file_path
+            SELECT original_filename, file_path, rejected_report_path
             FROM file_uploads
             WHERE id = ? AND user_id = ?
         ''', (upload_id, user_id))
         result = cursor.fetchone()
         if not result:
-            conn.close()
             flash('File not found or access denied', 'error')
             return redirect(url_for('upload_history'))
-        original_filename, file_path = result
+        original_filename, file_path, report_path = result
         # Delete file record
         cursor.execute('DELETE FROM file_uploads WHERE id = ?', (upload_id,))
         conn.commit()
-        conn.close()
-        # Delete physical file
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except OSError as e:
-                print(f"Error deleting physical file: {e}")
+        # Delete physical file and its rejected-rows report
+        for path in (file_path, report_path):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Error deleting physical file: {e}")
         # Log deletion activity
         DatabaseSecurity.safe_log_activity(
             user_id,
@@ -1806,10 +3267,13 @@ def delete_upload(upload_id):
         flash(f'File "{original_filename}" deleted successfully', 'success')
         return redirect(url_for('upload_history'))
     except Exception as e:
+        if conn:
+            conn.rollback()
         log_security_event('deletion_error', str(e), user_id)
         flash('Error deleting file', 'error')
         print(f"Deletion error: {e}")
         return redirect(url_for('upload_history'))
 if __name__ == '__main__':
     init_database()
+    resume_local_jobs()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Asynchronous audit log writer for the NBA MVP Decision Support System
+
+Requests hand user_activity rows to an in-process queue instead of
+inserting and committing them one by one. A background thread writes the
+queued rows in one transaction per batch, at most every flush_interval
+seconds or as soon as batch_size rows are waiting. close() (registered
+with atexit by the web app) writes whatever is still queued before the
+process exits. Logging never blocks a request: a batch that cannot be
+written (e.g. 'database is locked') is kept and retried with the next
+batch, and only dropped after max_retries failed writes in a row; when the
+queue is full new events are dropped. Dropped events are counted and
+reported through the 'security' logger.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from db_utils import DATABASE_PATH, connect_db
+
+# Longest time a logged event waits before it is written
+AUDIT_FLUSH_INTERVAL = 0.25
+
+# Events written per transaction; a full batch is written immediately
+AUDIT_BATCH_SIZE = 200
+
+# Events held in memory; further events are dropped until the writer catches up
+AUDIT_MAX_QUEUE = 10_000
+
+# Failed writes in a row before the events waiting to be written are dropped
+AUDIT_MAX_RETRIES = 5
+
+# Same logger as security_utils (which imports this module)
+security_logger = logging.getLogger('security')
+
+# Queue markers: write the current batch now / write it and exit
+_FLUSH = object()
+_STOP = object()
+
+class AuditLogWriter:
+    """Queue user_activity rows and write them in batches from a background thread"""
+
+    def __init__(self, db_path=DATABASE_PATH, flush_interval=AUDIT_FLUSH_INTERVAL,
+                 batch_size=AUDIT_BATCH_SIZE, max_queue=AUDIT_MAX_QUEUE, max_retries=AUDIT_MAX_RETRIES):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._dropped = 0
+
+    def log(self, user_id, action_type, action_details=None, ip_address=None, user_agent=None):
+        """Queue one activity row; the timestamp is taken now, not when it is written"""
+        # Same format as SQLite's CURRENT_TIMESTAMP (UTC)
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        self._start()
+        try:
+            self._queue.put_nowait((user_id, action_type, action_details, ip_address, user_agent, timestamp))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+                first_drop = self._dropped == 1
+            if first_drop:
+                security_logger.warning('Audit log queue full; dropping events until the writer catches up')
+
+    def flush(self):
+        """Block until a write of every event queued so far has been attempted"""
+        if self._running():
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+    def close(self):
+        """Write the remaining events and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def _start(self):
+        # Started on first use so importing the module never spawns a thread;
+        # restarted if it ever died
+        if not self._running():
+            with self._lock:
+                if not self._running():
+                    self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+                    self._thread.start()
+
+    def _report_dropped(self):
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            security_logger.error(f"Dropped {dropped} audit log events while the queue was full")
+
+    def _run(self):
+        conn = None
+        # Rows of failed writes, retried with the next batch
+        pending = []
+        failures = 0
+        try:
+            stopping = False
+            while not stopping:
+                batch = [self._queue.get()]
+                # Collect more events until the batch is full or the interval ends
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size and batch[-1] is not _FLUSH and batch[-1] is not _STOP:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                stopping = batch[-1] is _STOP
+                rows = pending + (batch[:-1] if batch[-1] is _FLUSH or stopping else batch)
+                try:
+                    conn, error = self._write(conn, rows)
+                    if error is None:
+                        pending, failures = [], 0
+                    else:
+                        failures += 1
+                        if failures >= self.max_retries or stopping:
+                            security_logger.error(
+                                f"Dropped {len(rows)} audit log events after {failures} failed writes: {error}")
+                            pending, failures = [], 0
+                        else:
+                            pending = rows
+                    self._report_dropped()
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write(self, conn, rows):
+        """
+        Write one batch. Returns (connection for the next batch, error or None)
+        """
+        if not rows:
+            return conn, None
+        try:
+            # (Re)connect lazily so a database that cannot be opened yet is retried next batch
+            if conn is None:
+                conn = connect_db(self.db_path)
+            conn.executemany('''
+                INSERT INTO user_activity (user_id, action_type, action_details, ip_address, user_agent, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+            return conn, None
+        except Exception as e:
+            security_logger.warning(f"Error writing {len(rows)} audit log events, will retry: {e}")
+            if conn is not None:
+                try:
+                    conn.rollback()
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            return None, e
+
+# Shared by the web app and security_utils
+audit_log = AuditLogWriter()
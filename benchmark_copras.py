@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized COPRAS kernel against the original pandas path
+Usage: python benchmark_copras.py [rows ...]
+       python benchmark_copras.py --memory [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from app import (MVPCalculator, COPRA_MVP_WEIGHTS, COPRA_BENEFIT_CRITERIA, COPRA_COST_CRITERIA,
+                 CSV_TO_DB_COLUMNS, SCHEMA_MIGRATIONS, load_season_data)
+from calculation_utils import copras_scores_pandas, make_season_frame
+from db_utils import connect_db
+from migrations import migrate
+
+DEFAULT_SIZES = [500, 50_000, 1_000_000]
+DEFAULT_MEMORY_ROWS = 1_000_000
+
+
+def best_time(func, repeats):
+    """Return the best wall time in seconds over several runs"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark(sizes):
+    """Time both implementations for each row count and print a summary table"""
+    calculator = MVPCalculator()
+
+    print("COPRAS benchmark: pandas path vs NumPy kernel")
+    print("=" * 60)
+    print(f"{'Rows':>10} {'pandas (ms)':>14} {'kernel (ms)':>14} {'speedup':>10}")
+    print("-" * 60)
+
+    for n_rows in sizes:
+        df = make_season_frame(n_rows)
+        repeats = 5 if n_rows <= 50_000 else 2
+
+        pandas_time = best_time(
+            lambda: copras_scores_pandas(df, COPRA_MVP_WEIGHTS, COPRA_BENEFIT_CRITERIA, COPRA_COST_CRITERIA),
+            repeats
+        )
+        kernel_time = best_time(lambda: calculator.calculate_mvp_scores(df), repeats)
+
+        print(f"{n_rows:>10,} {pandas_time * 1000:>14.2f} {kernel_time * 1000:>14.2f} "
+              f"{pandas_time / kernel_time:>9.1f}x")
+
+    print("=" * 60)
+
+
+def make_archive_database(n_rows, seed=0, batch_rows=100_000):
+    """
+    Create a temporary database with the application schema holding a
+    synthetic multi-season archive (1950-2024, repeated player and team
+    names). Returns its path.
+    """
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    conn = connect_db(path)
+    try:
+        migrate(conn, SCHEMA_MIGRATIONS)
+        rng = np.random.default_rng(seed)
+        seasons = np.sort(rng.integers(1950, 2025, n_rows))
+        stat_columns = ', '.join(CSV_TO_DB_COLUMNS.values())
+        for start in range(0, n_rows, batch_rows):
+            ids = np.arange(start + 1, min(start + batch_rows, n_rows) + 1)
+            conn.executemany(
+                'INSERT INTO players (id, name, team, season) VALUES (?, ?, ?, ?)',
+                zip(ids.tolist(), (f'Player {i}' for i in rng.integers(0, 5000, len(ids))),
+                    (f'Team {i}' for i in rng.integers(0, 30, len(ids))), seasons[ids - 1].tolist())
+            )
+            stats = rng.random((len(ids), len(CSV_TO_DB_COLUMNS))) * 40
+            conn.executemany(
+                f'INSERT INTO statistics (player_id, {stat_columns}) VALUES (?{", ?" * len(CSV_TO_DB_COLUMNS)})',
+                ([player_id] + row for player_id, row in zip(ids.tolist(), stats.tolist()))
+            )
+            conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def measure_peak(db_path, compact):
+    """Peak traced memory in MB for loading the archive with load_season_data and ranking every season"""
+    conn = connect_db(db_path, read_only=True)
+    try:
+        tracemalloc.start()
+        df = load_season_data(conn, compact=compact)
+        frame_mb = df.memory_usage(deep=True).sum() / 2**20
+        MVPCalculator(compact=compact).calculate_mvp_scores_batch(df)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        conn.close()
+    return frame_mb, peak / 2**20
+
+
+def run_memory_benchmark(n_rows):
+    """Compare peak memory of the default and compact calculation modes"""
+    db_path = make_archive_database(n_rows)
+    try:
+        print(f"Peak memory, all seasons loaded and ranked at once ({n_rows:,} synthetic rows)")
+        print("=" * 60)
+        print(f"{'Mode':>10} {'frame (MB)':>14} {'peak (MB)':>14}")
+        print("-" * 60)
+        for label, compact in (('default', False), ('compact', True)):
+            frame_mb, peak_mb = measure_peak(db_path, compact)
+            print(f"{label:>10} {frame_mb:>14.1f} {peak_mb:>14.1f}")
+        print("=" * 60)
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--memory']:
+        run_memory_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MEMORY_ROWS)
+    else:
+        sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+        run_benchmark(sizes)
@@ -0,0 +1,802 @@
+"""
+Calculation utilities for NBA MVP Decision Support System
+Vectorized NumPy kernels for the COPRAS method used by MVPCalculator and
+the other MCDM methods (TOPSIS, SAW, WASPAS, VIKOR) sharing its decision matrix
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Criteria columns of the calculator's decision matrix
+CRITERIA = [f'C{i}' for i in range(1, 12)]
+
+# Weighted values below this threshold drop a player from the ranking
+MIN_WEIGHTED_VALUE = 0.000001
+
+# Decimal places Si+ and Si- are rounded to before Qi is computed
+SI_ROUND_DECIMALS = 5
+
+# Share of the weighted sum model in WASPAS (the rest is the product model)
+WASPAS_LAMBDA = 0.5
+
+# VIKOR weight of the group utility strategy ("majority of criteria")
+VIKOR_V = 0.5
+
+# Smallest normalized value entering the WASPAS product model, so a player at
+# the worst value of one criterion is penalized instead of scoring 0 overall
+WASPAS_PRODUCT_FLOOR = 0.01
+
+
+def build_criteria_matrix(df, criteria, dtype=np.float64):
+    """
+    Build one Fortran-ordered float64 matrix (players x criteria) from the
+    criteria columns of df. Non-numeric values are coerced to 0, exactly like
+    the pandas path. Each criterion column is contiguous in memory so column
+    totals and row sums reduce in the same order pandas does.
+    Pass dtype=np.float32 for the compact mode's half-size matrix.
+    """
+    matrix = np.empty((len(df), len(criteria)), dtype=dtype, order='F')
+    for j, col in enumerate(criteria):
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values) or values.isna().any():
+            values = pd.to_numeric(values, errors='coerce').fillna(0)
+        matrix[:, j] = values.to_numpy(dtype=dtype)
+    return matrix
+
+
+def compact_frame(df, criteria, category_columns=('A', 'team')):
+    """
+    Downcast a calculator frame in place for the compact mode: int32 ids,
+    categorical name/team columns and float32 criteria. Returns df.
+    """
+    if 'id' in df.columns:
+        df['id'] = df['id'].astype(np.int32)
+    if 'season' in df.columns:
+        df['season'] = df['season'].astype(np.int16)
+    for col in category_columns:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in criteria:
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values) or values.isna().any():
+            values = pd.to_numeric(values, errors='coerce').fillna(0)
+        df[col] = values.astype(np.float32)
+    return df
+
+
+def normalize_in_place(matrix):
+    """
+    Sum-normalize each criterion column of matrix in place.
+    A column with a zero total normalizes to 0, like the pandas path.
+    """
+    # Accumulate in float64 so a float32 matrix keeps accurate totals
+    totals = matrix.sum(axis=0, dtype=np.float64)
+    zero_totals = totals == 0
+    if zero_totals.any():
+        totals[zero_totals] = 1.0
+        matrix[:, zero_totals] = 0.0
+    np.divide(matrix, totals, out=matrix)
+    return matrix
+
+
+def segment_starts(sorted_keys):
+    """Start offsets of each run of equal values in a sorted key array"""
+    sorted_keys = np.asarray(sorted_keys)
+    if len(sorted_keys) == 0:
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+
+
+def copras_kernel(matrix, weights, n_benefit, threshold=MIN_WEIGHTED_VALUE):
+    """
+    Run COPRAS normalization, weighting, filtering and Qi in place on matrix.
+
+    matrix holds benefit criteria in its first n_benefit columns followed by
+    cost criteria; weights is aligned with its columns. The matrix is
+    overwritten with the weighted normalized values.
+
+    Returns (kept_idx, qi): row positions that passed the filter mask and
+    their Qi scores.
+    """
+    starts = np.zeros(1 if matrix.shape[0] else 0, dtype=np.intp)
+    kept_idx, _, qi = copras_kernel_segmented(matrix, weights, n_benefit, starts, threshold)
+    return kept_idx, qi
+
+
+def copras_kernel_segmented(matrix, weights, n_benefit, starts, threshold=MIN_WEIGHTED_VALUE):
+    """
+    Run COPRAS for several independent groups (seasons) in one pass.
+
+    Rows of matrix must be sorted by group, with starts giving the first row
+    of each group. Column totals and s_min are reduced per group; everything
+    else is a single broadcast operation over the whole matrix.
+
+    Returns (kept_idx, kept_segments, qi): row positions that passed the
+    filter mask, the group number of each kept row and their Qi scores.
+    """
+    n_rows = matrix.shape[0]
+    bounds = np.r_[starts, n_rows]
+
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        # Each group slice is a view, so totals reduce in the same order as a
+        # single-season run and normalization stays in place
+        normalize_in_place(matrix[start:end])
+
+    np.multiply(matrix, weights, out=matrix)
+    return copras_scores_weighted(matrix, n_benefit, starts, threshold)
+
+
+def copras_scores_weighted(weighted, n_benefit, starts, threshold=MIN_WEIGHTED_VALUE):
+    """
+    Apply the filter mask and compute Si+, Si- and Qi from an already
+    weighted normalized matrix whose rows are grouped by starts.
+    Returns (kept_idx, kept_segments, qi) like copras_kernel_segmented.
+    """
+    n_rows = weighted.shape[0]
+    bounds = np.r_[starts, n_rows]
+
+    if weighted.shape[1]:
+        kept_idx = np.flatnonzero((weighted >= threshold).all(axis=1))
+    else:
+        kept_idx = np.arange(n_rows)
+
+    # Row sums are independent of the mask, so reduce first and filter the
+    # two result vectors instead of copying the filtered matrix
+    si_plus = weighted[:, :n_benefit].sum(axis=1, dtype=np.float64)[kept_idx].round(SI_ROUND_DECIMALS)
+    si_minus = weighted[:, n_benefit:].sum(axis=1, dtype=np.float64)[kept_idx].round(SI_ROUND_DECIMALS)
+
+    segment_ids = np.repeat(np.arange(len(starts)), np.diff(bounds))
+    kept_segments = segment_ids[kept_idx]
+
+    s_min = None
+    if len(kept_idx) and len(starts) > 1:
+        kept_starts = segment_starts(kept_segments)
+        group_min = np.minimum.reduceat(si_minus, kept_starts)
+        s_min = np.repeat(group_min, np.diff(np.r_[kept_starts, len(kept_idx)]))
+
+    return kept_idx, kept_segments, copras_qi(si_plus, si_minus, s_min)
+
+
+def copras_qi(si_plus, si_minus, s_min=None):
+    """
+    Calculate Qi from rounded Si+ and Si- values. s_min defaults to the
+    minimum Si- of the alternatives given. si_minus is modified in place.
+    """
+    if len(si_minus) == 0:
+        return np.empty(0, dtype=np.float64)
+    if s_min is None:
+        s_min = si_minus.min()
+    # Avoid division by zero by replacing 0 in Si- with epsilon
+    si_minus[si_minus == 0] = np.finfo(float).eps
+    return si_plus + ((s_min * si_plus) / si_minus)
+
+
+def _group_rows(groups):
+    """Yield (group, row positions) for a chunk's group keys (None: one group)"""
+    if groups is None:
+        yield None, slice(None)
+        return
+    keys, inverse = np.unique(groups, return_inverse=True)
+    for i, key in enumerate(keys):
+        yield key.item(), np.flatnonzero(inverse == i)
+
+
+class StreamingCopras:
+    """
+    Out-of-core COPRAS over data that arrives in chunks, per group (season).
+
+    Column totals and s_min are the only group-wide values COPRAS needs,
+    but s_min is taken over normalized sums and so depends on the totals.
+    The chunks are therefore scanned three times with flat memory:
+    add_totals() sums the criteria columns, add_s_min() finds the smallest
+    kept Si-, and score() returns Qi for the rows of each chunk.
+    """
+
+    def __init__(self, weights, n_benefit, threshold=MIN_WEIGHTED_VALUE):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.n_benefit = n_benefit
+        self.threshold = threshold
+        self.totals = {}
+        self.s_min = {}
+
+    def add_totals(self, matrix, groups=None):
+        """Pass one: accumulate the column totals of a chunk"""
+        for group, rows in _group_rows(groups):
+            part = matrix[rows].sum(axis=0, dtype=np.float64)
+            if group in self.totals:
+                self.totals[group] += part
+            else:
+                self.totals[group] = part
+
+    def _weighted_sums(self, matrix, groups):
+        """Filter mask, rounded Si+ and Si- of a chunk from the final totals"""
+        weighted = np.empty(matrix.shape, dtype=np.float64, order='F')
+        for group, rows in _group_rows(groups):
+            totals = self.totals[group]
+            zero_totals = totals == 0
+            # Same operation order as normalize_in_place and the kernel
+            normalized = np.divide(matrix[rows], np.where(zero_totals, 1.0, totals), dtype=np.float64)
+            normalized[:, zero_totals] = 0.0
+            weighted[rows] = normalized * self.weights
+
+        if weighted.shape[1]:
+            kept = (weighted >= self.threshold).all(axis=1)
+        else:
+            kept = np.ones(weighted.shape[0], dtype=bool)
+        si_plus = weighted[:, :self.n_benefit].sum(axis=1).round(SI_ROUND_DECIMALS)
+        si_minus = weighted[:, self.n_benefit:].sum(axis=1).round(SI_ROUND_DECIMALS)
+        return kept, si_plus, si_minus
+
+    def add_s_min(self, matrix, groups=None):
+        """Pass two: track the smallest Si- among the kept rows of a chunk"""
+        kept, _, si_minus = self._weighted_sums(matrix, groups)
+        for group, rows in _group_rows(groups):
+            group_si_minus = si_minus[rows][kept[rows]]
+            if len(group_si_minus):
+                chunk_min = group_si_minus.min()
+                self.s_min[group] = min(self.s_min.get(group, chunk_min), chunk_min)
+
+    def score(self, matrix, groups=None):
+        """
+        Pass three: score a chunk. Returns (kept_idx, qi) with the chunk row
+        positions that passed the filter mask and their Qi values.
+        """
+        kept, si_plus, si_minus = self._weighted_sums(matrix, groups)
+        qi = np.full(matrix.shape[0], np.nan)
+        for group, rows in _group_rows(groups):
+            group_rows = np.arange(matrix.shape[0])[rows]
+            group_rows = group_rows[kept[group_rows]]
+            if len(group_rows):
+                qi[group_rows] = copras_qi(si_plus[group_rows], si_minus[group_rows], self.s_min[group])
+        kept_idx = np.flatnonzero(kept)
+        return kept_idx, qi[kept_idx]
+
+
+def rank_descending(scores):
+    """
+    Order scores from best to worst and assign 'min' method ranks.
+
+    The sort is stable, so tied scores keep their row order like the
+    segmented and top-K paths. Returns (order, ranks) where ranks are
+    aligned with order.
+    """
+    order = np.argsort(-scores, kind='stable')
+    sorted_scores = scores[order]
+    # Tied scores get the lowest rank number of the group
+    ranks = np.searchsorted(-sorted_scores, -sorted_scores, side='left') + 1
+    return order, ranks
+
+
+def rank_descending_segmented(scores, segment_ids):
+    """
+    Order scores best to worst within each group and assign 'min' method
+    ranks per group; ties keep their row order. Returns (order, ranks) where ranks are aligned with
+    order and rows are grouped by ascending segment id.
+    """
+    order = np.lexsort((-scores, segment_ids))
+    if len(order) == 0:
+        return order, np.empty(0, dtype=np.intp)
+
+    sorted_scores = scores[order]
+    sorted_segments = segment_ids[order]
+    new_segment = np.r_[True, sorted_segments[1:] != sorted_segments[:-1]]
+    new_value = new_segment | np.r_[True, sorted_scores[1:] != sorted_scores[:-1]]
+
+    # Position where the current group and the current tie run began
+    positions = np.arange(len(order))
+    segment_start = np.maximum.accumulate(np.where(new_segment, positions, 0))
+    tie_start = np.maximum.accumulate(np.where(new_value, positions, 0))
+    return order, tie_start - segment_start + 1
+
+
+def top_k_descending(scores, k):
+    """
+    Select the k best scores with a partial selection instead of a full sort
+    and assign 'min' method ranks. Players tied with the k-th best score are
+    all kept, so more than k rows can be returned. Returns (order, ranks)
+    like rank_descending; ties are ordered by position.
+    """
+    n = len(scores)
+    if k >= n:
+        return rank_descending(scores)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    # argpartition puts the k largest scores in the last k slots in O(n)
+    kth_score = scores[np.argpartition(scores, n - k)[n - k:]].min()
+    candidates = np.flatnonzero(scores >= kth_score)
+
+    order = candidates[np.argsort(-scores[candidates], kind='stable')]
+    sorted_scores = scores[order]
+    # Every higher score is among the candidates, so 'min' ranks stay exact
+    ranks = np.searchsorted(-sorted_scores, -sorted_scores, side='left') + 1
+    return order, ranks
+
+
+def top_k_descending_segmented(scores, segment_ids, k):
+    """
+    Apply top_k_descending within each group of a non-decreasing
+    segment_ids array. Returns (order, ranks) grouped by segment id.
+    """
+    bounds = np.r_[segment_starts(segment_ids), len(segment_ids)]
+    orders, ranks = [np.empty(0, dtype=np.intp)], [np.empty(0, dtype=np.intp)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        order, rank = top_k_descending(scores[start:end], k)
+        orders.append(order + start)
+        ranks.append(rank)
+    return np.concatenate(orders), np.concatenate(ranks)
+
+
+def copras_scores_normalized(normalized, weights, n_benefit, threshold=MIN_WEIGHTED_VALUE):
+    """
+    Score a cached sum-normalized matrix with a weight vector, leaving the
+    normalized matrix untouched. Returns (kept_idx, qi) like copras_kernel.
+    """
+    # order='K' keeps the column-contiguous layout so row sums match the kernel
+    weighted = np.multiply(normalized, weights)
+    starts = np.zeros(1 if weighted.shape[0] else 0, dtype=np.intp)
+    kept_idx, _, qi = copras_scores_weighted(weighted, n_benefit, starts, threshold)
+    return kept_idx, qi
+
+
+class SeasonMatrixCache:
+    """
+    Thread-safe LRU cache of sum-normalized season decision matrices.
+
+    The normalized matrix does not depend on the weights, so it is cached
+    per season together with the player rows it belongs to. Entries are
+    keyed by the season's data version; a lookup with a newer version is a
+    miss and the stale entry is replaced on the next put().
+    """
+
+    def __init__(self, max_seasons=16):
+        self.max_seasons = max_seasons
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, season, data_version):
+        """Return the cached (players, normalized) pair or None"""
+        with self._lock:
+            entry = self._entries.get(season)
+            if entry is None or entry['data_version'] != data_version:
+                return None
+            self._entries.move_to_end(season)
+            return entry['players'], entry['normalized']
+
+    def put(self, season, data_version, players, normalized):
+        """Store a season's player rows and normalized matrix"""
+        normalized.setflags(write=False)
+        with self._lock:
+            self._entries[season] = {
+                'data_version': data_version,
+                'players': players,
+                'normalized': normalized
+            }
+            self._entries.move_to_end(season)
+            while len(self._entries) > self.max_seasons:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, season=None):
+        """Drop one season, or every season when season is None"""
+        with self._lock:
+            if season is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(season, None)
+
+
+class RankingResultCache:
+    """
+    Thread-safe LRU memo of ranking results that are currently stored.
+
+    Keys are (season, data_version, weight_hash, method, ...) tuples, so a
+    season whose data or weights changed simply misses. invalidate() drops
+    every entry of a season when its rows are replaced or deleted.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the memoized result for key or None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, result):
+        """Memoize the result stored for key"""
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, season=None):
+        """Drop the entries of one season, or every entry when season is None"""
+        with self._lock:
+            if season is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == season]:
+                del self._entries[key]
+
+
+def weight_hash(weights):
+    """Stable short hash of a float64 weight vector for cache keys"""
+    return hashlib.sha256(np.ascontiguousarray(weights, dtype=np.float64).tobytes()).hexdigest()[:16]
+
+
+def rank_matrix_descending(scores):
+    """
+    Rank every column of a (players x K) score matrix independently with
+    the 'min' method. NaN scores (filtered players) stay unranked as NaN.
+    """
+    n_rows, n_cols = scores.shape
+    flat = scores.T.ravel()
+    valid = np.flatnonzero(~np.isnan(flat))
+    order, ranks = rank_descending_segmented(flat[valid], valid // max(n_rows, 1))
+
+    ranked = np.full(n_rows * n_cols, np.nan)
+    ranked[valid[order]] = ranks
+    return ranked.reshape(n_cols, n_rows).T
+
+
+def weight_samples(base_weights, samples, spread, seed=None):
+    """
+    Draw weight vectors around base_weights by scaling each weight with an
+    independent uniform factor in [1 - spread, 1 + spread]. The first
+    column is always the unperturbed base vector. Returns a (criteria x K)
+    matrix.
+    """
+    base = np.asarray(base_weights, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    factors = rng.uniform(1.0 - spread, 1.0 + spread, size=(len(base), samples))
+    factors[:, 0] = 1.0
+    return base[:, None] * factors
+
+
+def weight_grid(base_weights, criteria, multipliers):
+    """
+    Build the cartesian grid of weight vectors where each criterion in
+    multipliers (criterion -> list of scale factors) takes every listed
+    factor and the other criteria keep their base weight.
+    Returns a (criteria x K) matrix.
+    """
+    base = np.asarray(base_weights, dtype=np.float64)
+    positions = [criteria.index(c) for c in multipliers]
+    mesh = np.meshgrid(*[np.asarray(f, dtype=np.float64) for f in multipliers.values()], indexing='ij')
+
+    grid = np.repeat(base[:, None], mesh[0].size if mesh else 1, axis=1)
+    for position, factors in zip(positions, mesh):
+        grid[position] *= factors.ravel()
+    return grid
+
+
+def copras_weight_sweep(matrix, weight_matrix, n_benefit, threshold=MIN_WEIGHTED_VALUE):
+    """
+    Score every player under K weight vectors at once.
+
+    matrix is the (players x criteria) decision matrix, normalized in place;
+    weight_matrix is (criteria x K). Si+ and Si- for all vectors come from
+    one matrix product each. Returns a (players x K) Qi matrix with NaN where
+    a player is dropped by the filter mask for that weight vector.
+    """
+    normalized = normalize_in_place(matrix)
+    weight_matrix = np.asarray(weight_matrix, dtype=np.float64)
+    n_rows, n_cols = normalized.shape[0], weight_matrix.shape[1]
+
+    # A player is kept when every weighted value reaches the threshold
+    mask = np.ones((n_rows, n_cols), dtype=bool)
+    for j in range(normalized.shape[1]):
+        mask &= np.multiply.outer(normalized[:, j], weight_matrix[j]) >= threshold
+
+    si_plus = (normalized[:, :n_benefit] @ weight_matrix[:n_benefit]).round(SI_ROUND_DECIMALS)
+    si_minus = (normalized[:, n_benefit:] @ weight_matrix[n_benefit:]).round(SI_ROUND_DECIMALS)
+
+    s_min = np.where(mask, si_minus, np.inf).min(axis=0) if n_rows else np.zeros(n_cols)
+    si_minus[si_minus == 0] = np.finfo(float).eps
+    qi = si_plus + ((s_min * si_plus) / si_minus)
+    qi[~mask] = np.nan
+    return qi
+
+
+def summarize_rank_distribution(ranks):
+    """
+    Summarize a (players x K) rank matrix into per-player distribution and
+    stability statistics. Unranked (NaN) entries are ignored, except for
+    'ranked_share' which reports how often the player passed the filter.
+    """
+    n_cols = ranks.shape[1]
+    ranked = ~np.isnan(ranks)
+    counts = ranked.sum(axis=1)
+    has_rank = counts > 0
+
+    stats = pd.DataFrame({
+        'ranked_share': counts / n_cols if n_cols else 0.0,
+        'top1_share': (ranks == 1).sum(axis=1) / n_cols if n_cols else 0.0,
+        'top3_share': (ranks <= 3).sum(axis=1) / n_cols if n_cols else 0.0,
+        'top10_share': (ranks <= 10).sum(axis=1) / n_cols if n_cols else 0.0,
+    })
+
+    percentiles = np.full((len(ranks), 5), np.nan)
+    mean = np.full(len(ranks), np.nan)
+    std = np.full(len(ranks), np.nan)
+    if has_rank.any():
+        valid = ranks[has_rank]
+        percentiles[has_rank] = np.nanpercentile(valid, [0, 25, 50, 75, 100], axis=1).T
+        mean[has_rank] = np.nanmean(valid, axis=1)
+        std[has_rank] = np.nanstd(valid, axis=1)
+
+    stats['best_rank'] = percentiles[:, 0]
+    stats['rank_p25'] = percentiles[:, 1]
+    stats['median_rank'] = percentiles[:, 2]
+    stats['rank_p75'] = percentiles[:, 3]
+    stats['worst_rank'] = percentiles[:, 4]
+    stats['mean_rank'] = mean
+    stats['rank_std'] = std
+    stats['rank_iqr'] = stats['rank_p75'] - stats['rank_p25']
+    return stats
+
+
+class SeasonCoprasState:
+    """
+    Cached COPRAS criteria matrix and scores for one season.
+
+    Keeps the raw criteria matrix (rows in player id order, like the season
+    query) so inserted, updated or deleted rows can be applied to it instead
+    of re-reading the season. Every Qi depends on the column totals, so
+    score() is a full rescore of the cached matrix with copras_kernel; the
+    results are identical to a fresh calculation.
+    """
+
+    def __init__(self, player_ids, matrix, weights, n_benefit, threshold=MIN_WEIGHTED_VALUE):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.n_benefit = n_benefit
+        self.threshold = threshold
+        self.player_ids = np.asarray(player_ids, dtype=np.int64)
+        self.raw = np.asfortranarray(matrix, dtype=np.float64)
+        self.results = None
+        self._sort_rows()
+        self.score()
+
+    def _positions(self, player_ids):
+        """Row positions of player_ids in the matrix (-1 when absent)"""
+        return pd.Index(self.player_ids).get_indexer(player_ids)
+
+    def _sort_rows(self):
+        # Keep the row order of the season query so column totals are summed
+        # in the same order as a full recalculation
+        order = np.argsort(self.player_ids, kind='stable')
+        if (order != np.arange(len(order))).any():
+            self.player_ids = self.player_ids[order]
+            self.raw = np.asfortranarray(self.raw[order])
+
+    def upsert(self, player_ids, matrix):
+        """Insert new rows or replace existing ones"""
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(len(player_ids), self.raw.shape[1])
+        positions = self._positions(player_ids)
+        existing = positions >= 0
+
+        if existing.any():
+            self.raw[positions[existing]] = matrix[existing]
+
+        if (~existing).any():
+            self.raw = np.asfortranarray(np.vstack([self.raw, matrix[~existing]]))
+            self.player_ids = np.r_[self.player_ids, player_ids[~existing]]
+            self._sort_rows()
+
+    def delete(self, player_ids):
+        """Remove rows"""
+        positions = self._positions(np.asarray(player_ids, dtype=np.int64))
+        positions = positions[positions >= 0]
+        if len(positions) == 0:
+            return
+
+        keep = np.ones(len(self.player_ids), dtype=bool)
+        keep[positions] = False
+        self.raw = np.asfortranarray(self.raw[keep])
+        self.player_ids = self.player_ids[keep]
+
+    def score(self):
+        """Rescore the season from the cached matrix"""
+        kept_idx, qi = copras_kernel(np.array(self.raw, order='F'), self.weights, self.n_benefit, self.threshold)
+        order, ranks = rank_descending(qi)
+        self.results = pd.DataFrame(
+            {'final_score': qi[order], 'rank_position': ranks.astype(int)},
+            index=pd.Index(self.player_ids[kept_idx[order]], name='player_id')
+        )
+
+
+def _safe_divide(numerator, denominator):
+    """Element-wise division that yields 0 where the denominator is 0"""
+    numerator, denominator = np.broadcast_arrays(numerator, denominator)
+    out = np.zeros(numerator.shape, dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def linear_normalize(matrix, n_benefit):
+    """
+    Linear normalization used by SAW and WASPAS, so 1 is always best:
+    x / max for benefit criteria and (max - x) / (max - min) for cost
+    criteria. The cost form stays meaningful when a player has 0 turnovers
+    or fouls (min / x would zero the whole column); a constant cost column
+    is 1 for everyone.
+    """
+    normalized = np.empty_like(matrix, dtype=np.float64)
+    benefit, cost = matrix[:, :n_benefit], matrix[:, n_benefit:]
+    if matrix.shape[0]:
+        normalized[:, :n_benefit] = _safe_divide(benefit, benefit.max(axis=0))
+        cost_max = cost.max(axis=0)
+        cost_range = cost_max - cost.min(axis=0)
+        normalized[:, n_benefit:] = np.where(cost_range > 0, _safe_divide(cost_max - cost, cost_range), 1.0)
+    return normalized
+
+
+def copras_method_scores(matrix, weights, n_benefit):
+    """COPRAS Qi for every row, NaN for rows dropped by the filter mask"""
+    scores = np.full(matrix.shape[0], np.nan)
+    kept_idx, qi = copras_kernel(np.array(matrix, dtype=np.float64, order='F'), weights, n_benefit)
+    scores[kept_idx] = qi
+    return scores
+
+
+def saw_scores(matrix, weights, n_benefit):
+    """Simple Additive Weighting: weighted sum of linearly normalized values"""
+    return linear_normalize(matrix, n_benefit) @ weights
+
+
+def waspas_scores(matrix, weights, n_benefit, lam=WASPAS_LAMBDA):
+    """WASPAS: blend of the weighted sum and weighted product models"""
+    normalized = linear_normalize(matrix, n_benefit)
+    wsm = normalized @ weights
+    wpm = np.exp(np.log(np.maximum(normalized, WASPAS_PRODUCT_FLOOR)) @ weights)
+    return lam * wsm + (1 - lam) * wpm
+
+
+def topsis_scores(matrix, weights, n_benefit):
+    """TOPSIS relative closeness to the ideal solution (higher is better)"""
+    weighted = _safe_divide(matrix, np.sqrt((matrix ** 2).sum(axis=0))) * weights
+    if not weighted.shape[0]:
+        return np.empty(0, dtype=np.float64)
+
+    best = np.r_[weighted[:, :n_benefit].max(axis=0), weighted[:, n_benefit:].min(axis=0)]
+    worst = np.r_[weighted[:, :n_benefit].min(axis=0), weighted[:, n_benefit:].max(axis=0)]
+    d_best = np.sqrt(((weighted - best) ** 2).sum(axis=1))
+    d_worst = np.sqrt(((weighted - worst) ** 2).sum(axis=1))
+    return _safe_divide(d_worst, d_best + d_worst)
+
+
+def vikor_scores(matrix, weights, n_benefit, v=VIKOR_V):
+    """VIKOR compromise index Q (lower is better)"""
+    if not matrix.shape[0]:
+        return np.empty(0, dtype=np.float64)
+
+    best = np.r_[matrix[:, :n_benefit].max(axis=0), matrix[:, n_benefit:].min(axis=0)]
+    worst = np.r_[matrix[:, :n_benefit].min(axis=0), matrix[:, n_benefit:].max(axis=0)]
+    regret = weights * _safe_divide(best - matrix, best - worst)
+    s = regret.sum(axis=1)
+    r = regret.max(axis=1)
+
+    s_term = _safe_divide(s - s.min(), s.max() - s.min())
+    r_term = _safe_divide(r - r.min(), r.max() - r.min())
+    return v * s_term + (1 - v) * r_term
+
+
+# Registered MCDM methods: scoring function and whether higher scores rank better
+MCDM_METHODS = {
+    'copras': {'label': 'COPRAS', 'score': copras_method_scores, 'higher_is_better': True},
+    'topsis': {'label': 'TOPSIS', 'score': topsis_scores, 'higher_is_better': True},
+    'saw': {'label': 'SAW', 'score': saw_scores, 'higher_is_better': True},
+    'waspas': {'label': 'WASPAS', 'score': waspas_scores, 'higher_is_better': True},
+    'vikor': {'label': 'VIKOR', 'score': vikor_scores, 'higher_is_better': False}
+}
+
+
+def score_methods(matrix, weights, n_benefit, methods):
+    """
+    Score one decision matrix with several registered methods.
+    Returns (scores, ranks), both (players x methods) in the order of
+    methods; players a method does not rank are NaN in both.
+    """
+    scores = np.full((matrix.shape[0], len(methods)), np.nan)
+    for k, method in enumerate(methods):
+        scores[:, k] = MCDM_METHODS[method]['score'](matrix, weights, n_benefit)
+
+    # Flip lower-is-better scores so every column ranks in descending order
+    direction = np.array([1.0 if MCDM_METHODS[m]['higher_is_better'] else -1.0 for m in methods])
+    return scores, rank_matrix_descending(scores * direction)
+
+
+def borda_consensus(ranks):
+    """
+    Borda count over a (players x methods) rank matrix. A player ranked r
+    of m by a method earns m - r points; unranked players earn none.
+    Returns (points, consensus_ranks) with NaN ranks for players no method
+    ranked.
+    """
+    ranked = ~np.isnan(ranks)
+    points = np.where(ranked, ranked.sum(axis=0) - ranks, 0.0).sum(axis=1)
+    points = np.where(ranked.any(axis=1), points, np.nan)
+    return points, rank_matrix_descending(points[:, None])[:, 0]
+
+
+def make_season_frame(n_rows, seed=0):
+    """
+    Create a synthetic season frame in the calculator's 'A', 'Team', C1-C11
+    layout, for the equivalence tests and benchmarks.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.random((n_rows, 11)) * 40, columns=CRITERIA)
+    df.insert(0, 'id', np.arange(1, n_rows + 1))
+    df.insert(1, 'A', [f'Player {i}' for i in range(n_rows)])
+    df.insert(2, 'team', [f'Team {i % 30}' for i in range(n_rows)])
+    return df
+
+
+def copras_scores_pandas(df, weights, benefit_criteria, cost_criteria):
+    """
+    Reference pandas implementation of the COPRAS ranking.
+
+    This is the original DataFrame-based MVPCalculator path, kept to verify
+    the NumPy kernel produces identical output and to benchmark against it.
+    The one intended change is the stable sort: tied Qi keep their row
+    order (the original quicksort left large tie groups in arbitrary order).
+    """
+    copras_df = df[['C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'C8', 'C9', 'C10', 'C11']].copy()
+    for col in copras_df.columns:
+        copras_df[col] = pd.to_numeric(copras_df[col], errors='coerce').fillna(0)
+
+    all_criteria = benefit_criteria + cost_criteria
+
+    normalized_df = copras_df.copy()
+    for col_name_c in all_criteria:
+        col_total = copras_df[col_name_c].sum()
+        normalized_df[f"normalized_{col_name_c}"] = copras_df[col_name_c] / col_total if col_total != 0 else 0
+
+    weighted_df = normalized_df.copy()
+    for col_name_c in all_criteria:
+        weighted_df[f"weighted_{col_name_c}"] = weighted_df[f"normalized_{col_name_c}"] * weights[col_name_c]
+
+    weighted_cols_for_filter = [f"weighted_{c}" for c in all_criteria]
+
+    if weighted_cols_for_filter:
+        actual_weighted_cols_for_filter = [col for col in weighted_cols_for_filter if col in weighted_df.columns]
+        mask = (weighted_df[actual_weighted_cols_for_filter] >= MIN_WEIGHTED_VALUE).all(axis=1)
+        df = df.loc[mask].copy()
+        weighted_df = weighted_df.loc[mask].copy()
+
+        if df.empty:
+            return pd.DataFrame(columns=df.columns.tolist() + ['final_score', 'rank_position'])
+
+    weighted_benefit_cols = [f"weighted_{c}" for c in benefit_criteria]
+    actual_weighted_benefit_cols = [col for col in weighted_benefit_cols if col in weighted_df.columns]
+    weighted_df["Si+"] = weighted_df[actual_weighted_benefit_cols].sum(axis=1)
+
+    weighted_cost_cols = [f"weighted_{c}" for c in cost_criteria]
+    actual_weighted_cost_cols = [col for col in weighted_cost_cols if col in weighted_df.columns]
+    weighted_df["Si-"] = weighted_df[actual_weighted_cost_cols].sum(axis=1)
+
+    weighted_df["Si+"] = weighted_df["Si+"].round(SI_ROUND_DECIMALS)
+    weighted_df["Si-"] = weighted_df["Si-"].round(SI_ROUND_DECIMALS)
+
+    s_min = weighted_df["Si-"].min()
+    weighted_df["Si-"] = weighted_df["Si-"].replace(0, np.finfo(float).eps)
+    weighted_df["Qi"] = weighted_df["Si+"] + ((s_min * weighted_df["Si+"]) / weighted_df["Si-"])
+
+    results_df = df.copy()
+    results_df['final_score'] = weighted_df['Qi'].values
+    results_df = results_df.sort_values('final_score', ascending=False, kind='stable')
+    results_df['rank_position'] = results_df['final_score'].rank(ascending=False, method="min").astype(int)
+    results_df = results_df.reset_index(drop=True)
+
+    return results_df
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the tests: temporary SQLite database files.
+
+Plain functions rather than pytest fixtures, so every test module can still
+be run on its own with python test_<name>.py.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+
+def make_temp_database(setup=None, connect=sqlite3.connect):
+    """
+    Create a temporary database file and return its path. setup is an SQL
+    script or a function called with the connection (committed afterwards);
+    connect opens that connection (e.g. db_utils.connect_db for WAL mode).
+    """
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    if setup is not None:
+        conn = connect(path)
+        try:
+            if isinstance(setup, str):
+                conn.executescript(setup)
+            else:
+                setup(conn)
+            conn.commit()
+        finally:
+            conn.close()
+    return path
+
+
+def remove_temp_database(path):
+    """Remove a temporary database with its WAL and shared-memory files"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+SQLite connection handling for the NBA MVP Decision Support System
+
+Every connection is opened through connect_db(), which applies the
+pragmas below (WAL journal, relaxed fsync, busy timeout, memory-mapped
+reads and a larger page cache). Request code uses get_db(): one pooled
+connection per Flask app context, handed back to the pool on teardown.
+Pure reads (dashboards, rankings, reports) use get_read_db(), which comes
+from a separate pool of read-only connections that never take a write
+lock, so under WAL they run in parallel with ingestion. Code running
+outside an app context (CLI scripts, tests) gets one connection of each
+kind per thread instead.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+from flask import g, has_app_context
+
+DATABASE_PATH = 'nba_mvp.db'
+
+# Applied to every new connection. WAL lets readers run while a writer
+# commits; synchronous=NORMAL is durable across application crashes in
+# WAL mode and only fsyncs at checkpoints.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # ms to wait for a lock instead of failing
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,      # negative = KiB, i.e. 64MB
+}
+
+# Idle connections kept for reuse across requests
+DB_POOL_SIZE = 8
+
+def connect_db(path=DATABASE_PATH, read_only=False):
+    """
+    Open a new connection with SQLITE_PRAGMAS applied; the caller closes it.
+    read_only opens the file as a mode=ro URI with query_only set.
+    """
+    timeout = SQLITE_PRAGMAS['busy_timeout'] / 1000
+    if read_only:
+        uri = f'file:{pathname2url(os.path.abspath(path))}?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+
+    for pragma, value in SQLITE_PRAGMAS.items():
+        # The journal mode is stored in the file; read-write connections set it
+        if read_only and pragma == 'journal_mode':
+            continue
+        conn.execute(f'PRAGMA {pragma} = {value}')
+    if read_only:
+        conn.execute('PRAGMA query_only = ON')
+    return conn
+
+class ConnectionPool:
+    """A LIFO pool of configured (optionally read-only) connections to one database file"""
+
+    def __init__(self, path=DATABASE_PATH, max_idle=DB_POOL_SIZE, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect_db(self.path, read_only=self.read_only)
+
+    def release(self, conn):
+        # Never hand an open transaction or a custom row factory to the next user
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+pool = ConnectionPool()
+reader_pool = ConnectionPool(read_only=True)
+_thread_connections = threading.local()
+
+def get_db():
+    """
+    Return the connection for the current app context (acquired from the
+    pool on first use), or this thread's connection outside one. Callers
+    commit their own work but never close the connection.
+    """
+    if has_app_context():
+        if 'db' not in g:
+            g.db = pool.acquire()
+        return g.db
+
+    conn = getattr(_thread_connections, 'conn', None)
+    if conn is None:
+        conn = _thread_connections.conn = connect_db(pool.path)
+    return conn
+
+def get_read_db():
+    """
+    Like get_db(), but a read-only connection from the reader pool. Use it
+    for queries that never write; any write on it raises sqlite3.OperationalError.
+    """
+    if has_app_context():
+        if 'read_db' not in g:
+            g.read_db = reader_pool.acquire()
+        return g.read_db
+
+    conn = getattr(_thread_connections, 'read_conn', None)
+    if conn is None:
+        conn = _thread_connections.read_conn = connect_db(reader_pool.path, read_only=True)
+    return conn
+
+def close_db(exception=None):
+    """Teardown handler: return the app context's connections to their pools"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        pool.release(conn)
+    conn = g.pop('read_db', None)
+    if conn is not None:
+        reader_pool.release(conn)
+
+def init_app(app):
+    """Register the per-request connection teardown on a Flask app"""
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Durable job queue for the NBA MVP Decision Support System
+
+Jobs are rows in the SQLite 'jobs' table, so queued and running work
+survives restarts of the web process. A worker claims a job by taking a
+lease, keeps it alive with heartbeats while the handler runs and marks the
+job completed or failed. A job whose lease expires (the worker died) is
+claimed again by the next worker; failed jobs are retried with a growing
+delay until max_attempts is reached, unless the handler raised
+PermanentJobError for a failure a retry cannot fix.
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from db_utils import connect_db
+
+# Seconds a claimed job stays leased without a heartbeat
+DEFAULT_LEASE_SECONDS = 60
+
+# Base delay before a failed job is retried; multiplied by the attempt number
+RETRY_BACKOFF_SECONDS = 10
+
+def create_jobs_table(cursor):
+    """Create the jobs table and its claim index without committing"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            job_type TEXT NOT NULL,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after REAL NOT NULL,
+            worker_id TEXT,
+            lease_expires_at REAL,
+            heartbeat_at REAL,
+            result TEXT,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after)')
+
+def init_jobs_table(conn):
+    """Create the jobs table and its claim index"""
+    create_jobs_table(conn.cursor())
+    conn.commit()
+
+class PermanentJobError(Exception):
+    """Raised by a handler for a deterministic failure; the job fails without a retry"""
+
+class JobQueue:
+    """Enqueue, lease and finish jobs stored in the jobs table"""
+
+    def __init__(self, db_path='nba_mvp.db', lease_seconds=DEFAULT_LEASE_SECONDS,
+                 retry_backoff_seconds=RETRY_BACKOFF_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+    def _connect(self):
+        return connect_db(self.db_path)
+
+    def enqueue(self, job_type, payload=None, max_attempts=3, delay_seconds=0):
+        """Queue a job and return its id"""
+        job_id = str(uuid.uuid4())
+        conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT INTO jobs (id, job_type, payload, max_attempts, run_after)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (job_id, job_type, json.dumps(payload or {}), max_attempts, time.time() + delay_seconds))
+            conn.commit()
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self, worker_id, job_types=None):
+        """
+        Lease the next runnable job for worker_id: a queued job that is due,
+        or a running job whose lease has expired. Returns the job or None.
+        """
+        conn = self._connect()
+        try:
+            # Take the write lock first so two workers never claim the same job
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            query = '''
+                SELECT id, attempts, max_attempts FROM jobs
+                WHERE ((status = 'queued' AND run_after <= ?)
+                       OR (status = 'running' AND lease_expires_at < ?))
+            '''
+            params = [now, now]
+            if job_types:
+                query += f" AND job_type IN ({', '.join(['?'] * len(job_types))})"
+                params += list(job_types)
+            query += ' ORDER BY run_after, created_at'
+
+            for job_id, attempts, max_attempts in conn.execute(query, params).fetchall():
+                if attempts >= max_attempts:
+                    # A worker died holding the job on its last attempt
+                    conn.execute('''
+                        UPDATE jobs SET status = 'failed', worker_id = NULL,
+                            last_error = 'Lease expired on the final attempt', finished_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', (job_id,))
+                    continue
+
+                conn.execute('''
+                    UPDATE jobs
+                    SET status = 'running', attempts = attempts + 1, worker_id = ?,
+                        lease_expires_at = ?, heartbeat_at = ?
+                    WHERE id = ?
+                ''', (worker_id, now + self.lease_seconds, now, job_id))
+                conn.commit()
+                return self.get(job_id)
+
+            conn.commit()
+            return None
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id, worker_id):
+        """Extend the lease; returns False if the worker no longer holds it"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ?
+                WHERE id = ? AND worker_id = ? AND status = 'running'
+            ''', (now + self.lease_seconds, now, job_id, worker_id))
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def next_run_after(self, job_types=None):
+        """Return when the earliest queued job becomes runnable, or None if none is queued"""
+        query = "SELECT MIN(run_after) FROM jobs WHERE status = 'queued'"
+        params = []
+        if job_types:
+            query += f" AND job_type IN ({', '.join(['?'] * len(job_types))})"
+            params = list(job_types)
+        conn = self._connect()
+        try:
+            return conn.execute(query, params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def complete(self, job_id, worker_id, result=None):
+        """Mark a leased job as completed with an optional JSON result"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                UPDATE jobs
+                SET status = 'completed', result = ?, lease_expires_at = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND worker_id = ?
+            ''', (json.dumps(result), job_id, worker_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """Requeue a failed job with backoff, or fail it after its last attempt (or when retry is False)"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT attempts, max_attempts FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if retry and row and row[0] < row[1]:
+                conn.execute('''
+                    UPDATE jobs
+                    SET status = 'queued', worker_id = NULL, lease_expires_at = NULL, last_error = ?, run_after = ?
+                    WHERE id = ? AND worker_id = ?
+                ''', (str(error), time.time() + self.retry_backoff_seconds * row[0], job_id, worker_id))
+            else:
+                conn.execute('''
+                    UPDATE jobs
+                    SET status = 'failed', lease_expires_at = NULL, last_error = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND worker_id = ?
+                ''', (str(error), job_id, worker_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        """Return a job as a dict with decoded payload and result"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+
+        job = dict(row)
+        for key in ('payload', 'result'):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+class JobWorker:
+    """
+    Claim jobs from a JobQueue and run them with the matching handler.
+    Handlers are called as handler(payload, job) and return a JSON-able
+    result; raising marks the attempt as failed (PermanentJobError fails
+    the job without further attempts). A background thread sends
+    heartbeats while the handler runs. context, when given, is a factory for
+    a context manager entered around each handler call (for example
+    app.app_context, so per-context resources are released after every job).
+    """
+
+    def __init__(self, queue, handlers, worker_id=None, poll_interval=1.0, context=None):
+        self.queue = queue
+        self.handlers = handlers
+        self.context = context or contextlib.nullcontext
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+
+    def _keep_alive(self, job_id, done):
+        interval = max(self.queue.lease_seconds / 3, 0.1)
+        while not done.wait(interval):
+            try:
+                if not self.queue.heartbeat(job_id, self.worker_id):
+                    print(f"Worker {self.worker_id} lost the lease on job {job_id}")
+                    return
+            except sqlite3.Error as e:
+                print(f"Heartbeat error for job {job_id}: {e}")
+
+    def run_job(self, job):
+        """Run one claimed job and record its outcome. Returns True on success"""
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._keep_alive, args=(job['id'], done), daemon=True)
+        heartbeat.start()
+        try:
+            handler = self.handlers[job['job_type']]
+            with self.context():
+                result = handler(job['payload'], job)
+        except Exception as e:
+            print(f"Job {job['id']} ({job['job_type']}) failed on attempt {job['attempts']}: {e}")
+            self.queue.fail(job['id'], self.worker_id, e, retry=not isinstance(e, PermanentJobError))
+            return False
+        finally:
+            done.set()
+            heartbeat.join()
+
+        self.queue.complete(job['id'], self.worker_id, result)
+        return True
+
+    def run(self, once=False):
+        """
+        Process jobs until stop() is called. With once set, return when no
+        job is queued any more; jobs waiting out a retry delay are still
+        waited for, so they are not stranded.
+        """
+        job_types = list(self.handlers)
+        while not self.stop_event.is_set():
+            job = self.queue.claim(self.worker_id, job_types=job_types)
+            if job is None:
+                if once and self.queue.next_run_after(job_types) is None:
+                    return
+                self.stop_event.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def stop(self):
+        self.stop_event.set()
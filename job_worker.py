@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+NBA MVP Background Job Worker
+
+Claims jobs from the durable jobs table (CSV ingestion, batch MVP
+recalculation, PDF exports) and runs them outside the Flask processes.
+Set app.config['JOB_BACKEND'] = 'queue' so the web tier only enqueues, then
+start one or more workers on the same host:
+
+    python job_worker.py                          # run every job type
+    python job_worker.py --types ingest_upload    # a dedicated ingestion worker
+    python job_worker.py --once                   # drain the queue and exit
+"""
+
+import argparse
+import signal
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run NBA MVP background jobs from the jobs table.')
+    parser.add_argument('--types', nargs='+', metavar='JOB_TYPE',
+                        help='Only claim these job types (default: all)')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds to wait when the queue is empty (default: 1.0)')
+    parser.add_argument('--lease-seconds', type=int, default=None,
+                        help='Lease length; a job is retried if no heartbeat arrives in this time')
+    parser.add_argument('--worker-id', help='Name recorded on claimed jobs (default: host-pid-random)')
+    parser.add_argument('--once', action='store_true',
+                        help='Exit once no job is runnable instead of polling')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        from app import JOB_HANDLERS, app, init_database, job_queue
+        from job_queue import JobWorker
+    except ImportError as e:
+        print(f"Error importing modules: {e}")
+        print("Please ensure all required dependencies are installed:")
+        print("pip install flask werkzeug pandas numpy matplotlib seaborn fpdf2")
+        return 1
+
+    handlers = JOB_HANDLERS
+    if args.types:
+        unknown = [job_type for job_type in args.types if job_type not in JOB_HANDLERS]
+        if unknown:
+            print(f"Unknown job types: {', '.join(unknown)}. Available: {', '.join(JOB_HANDLERS)}")
+            return 1
+        handlers = {job_type: JOB_HANDLERS[job_type] for job_type in args.types}
+
+    if args.lease_seconds:
+        job_queue.lease_seconds = args.lease_seconds
+
+    init_database()
+    worker = JobWorker(job_queue, handlers, worker_id=args.worker_id, poll_interval=args.poll_interval,
+                       context=app.app_context)
+
+    # Finish the current job on Ctrl+C / SIGTERM, then exit
+    def request_stop(signum, frame):
+        print("\nStopping after the current job...")
+        worker.stop()
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    print("=" * 60)
+    print(f"NBA MVP job worker {worker.worker_id}")
+    print(f"Job types: {', '.join(handlers)}")
+    print("=" * 60)
+
+    worker.run(once=args.once)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
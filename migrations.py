@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the NBA MVP Decision Support System
+
+A migration is a (version, description, function) tuple; the function
+receives a cursor and changes the schema. The version a database has
+reached is stored in SQLite's PRAGMA user_version, so migrate() applies
+only the migrations that are newer, in order, each in its own
+transaction. Databases created before versioning start at version 0, so
+migrations must also succeed on tables that already have their changes
+(CREATE ... IF NOT EXISTS, add_column()).
+"""
+
+def schema_version(conn):
+    """Return the schema version recorded in the database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def table_columns(cursor, table):
+    """Return the column names of a table"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+def add_column(cursor, table, column, definition):
+    """Add a column unless the table already has it. Returns True if added"""
+    if column in table_columns(cursor, table):
+        return False
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return True
+
+def migrate(conn, migrations):
+    """
+    Apply every migration newer than the database's schema version.
+    Returns the list of versions applied.
+    """
+    applied = []
+    current = schema_version(conn)
+    for version, description, apply in sorted(migrations, key=lambda migration: migration[0]):
+        if version <= current:
+            continue
+
+        # Take the write lock up front so concurrent starts apply each migration once
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            apply(cursor)
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"Applied schema migration {version}: {description}")
+        applied.append(version)
+    return applied
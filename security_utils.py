@@ -13,6 +13,9 @@ from flask import request, session, abort, flash, redirect, url_for
 import logging
 from datetime import datetime, timedelta
 
+from audit_log import audit_log
+from db_utils import get_db
+
 # Configure logging for security events
 logging.basicConfig(level=logging.INFO)
 security_logger = logging.getLogger('security')
@@ -161,8 +164,9 @@ class DatabaseSecurity:
     @staticmethod
     def execute_query(query, params=None, fetch_one=False, fetch_all=False):
         """Execute parameterized query safely"""
+        conn = None
         try:
-            conn = sqlite3.connect('nba_mvp.db')
+            conn = get_db()
             cursor = conn.cursor()
             
             if params:
@@ -177,12 +181,14 @@ class DatabaseSecurity:
                 result = cursor.fetchall()
             
             conn.commit()
-            conn.close()
             
             return result
             
         except sqlite3.Error as e:
             security_logger.error(f"Database error: {e}")
+            # Don't leave a failed write open on the shared connection
+            if conn:
+                conn.rollback()
             return None
     
     @staticmethod
@@ -205,12 +211,8 @@ class DatabaseSecurity:
     
     @staticmethod
     def safe_log_activity(user_id, action_type, action_details, ip_address, user_agent):
-        """Safely log user activity"""
-        query = '''
-            INSERT INTO user_activity (user_id, action_type, action_details, ip_address, user_agent)
-            VALUES (?, ?, ?, ?, ?)
-        '''
-        return DatabaseSecurity.execute_query(query, (user_id, action_type, action_details, ip_address, user_agent))
+        """Safely log user activity (written asynchronously by the audit log writer)"""
+        audit_log.log(user_id, action_type, action_details, ip_address, user_agent)
 
 def security_headers(f):
     """Add security headers to responses"""
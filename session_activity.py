@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Coalesced session activity tracking for the NBA MVP Decision Support System
+
+Authenticated requests only record "session X was active at time T" in
+memory. A background thread writes the latest time of every touched
+session to user_sessions.last_activity in one transaction per interval,
+so page views and API calls never write to the database themselves.
+"""
+
+import threading
+from datetime import datetime, timezone
+
+from db_utils import DATABASE_PATH, connect_db
+
+# Seconds between bulk writes of last-activity times
+SESSION_ACTIVITY_FLUSH_SECONDS = 60
+
+class SessionActivityTracker:
+    """Keep the latest activity time per session and flush them in bulk"""
+
+    def __init__(self, db_path=DATABASE_PATH, flush_interval=SESSION_ACTIVITY_FLUSH_SECONDS):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def touch(self, session_id):
+        """Record activity for a session; written at the next flush"""
+        # Same format as SQLite's CURRENT_TIMESTAMP (UTC)
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self._pending[session_id] = timestamp
+            if self._thread is None:
+                # Started on first use so importing the module never spawns a thread
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='session-activity', daemon=True)
+                self._thread.start()
+
+    def discard(self, session_id):
+        """Forget a session's unwritten activity and return its time, or None"""
+        with self._lock:
+            return self._pending.pop(session_id, None)
+
+    def flush(self):
+        """Write every pending activity time. Returns the number of sessions written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        conn = connect_db(self.db_path)
+        try:
+            conn.executemany('''
+                UPDATE user_sessions
+                SET last_activity = ?
+                WHERE id = ? AND is_active = 1
+            ''', [(timestamp, session_id) for session_id, timestamp in pending.items()])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            # Keep the times for the next flush unless newer ones arrived meanwhile
+            with self._lock:
+                for session_id, timestamp in pending.items():
+                    self._pending.setdefault(session_id, timestamp)
+            print(f"Error updating session activity: {e}")
+            return 0
+        finally:
+            conn.close()
+        return len(pending)
+
+    def close(self):
+        """Stop the flush thread and write what is still pending"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
@@ -42,6 +42,7 @@ def main():
         
         print("Initializing database...")
         app.init_database()
+        app.resume_local_jobs()
         
         print("✓ Database initialized!")
         print("\n🌟 Starting Flask server...")
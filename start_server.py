@@ -10,7 +10,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from app import app, init_database
+    from app import app, init_database, resume_local_jobs
     
     print("=" * 60)
     print("NBA MVP Decision Support System")
@@ -18,6 +18,7 @@ try:
     
     print("Initializing database...")
     init_database()
+    resume_local_jobs()
     print("✓ Database initialized successfully")
     
     print("\nStarting Flask application...")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Out-of-core COPRAS ranking for bulk historical backfills
+Reads a CSV in the upload format or the statistics tables in chunks, so
+memory stays flat regardless of input size.
+
+Usage: python stream_copras.py --csv archive.csv --season 1987 [--top 10] [--output scores.csv]
+       python stream_copras.py --db [--season 1987 1988 ...] [--top 10] [--output scores.csv]
+"""
+
+import argparse
+import sys
+
+from app import MVPCalculator, STREAM_CHUNK_ROWS, csv_chunk_source, db_chunk_source
+
+
+def csv_sink(file_path):
+    """Sink that appends every scored chunk to a CSV file"""
+    state = {'first': True}
+
+    def write(scored):
+        scored.to_csv(file_path, mode='w' if state['first'] else 'a', header=state['first'], index=False)
+        state['first'] = False
+    return write
+
+
+def parse_args(argv):
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description='Stream COPRAS MVP scores from a CSV file or the database.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help="CSV with columns 'A', 'Team', 'C1'-'C11'")
+    source.add_argument('--db', action='store_true', help='read the players and statistics tables')
+    parser.add_argument('--season', type=int, nargs='*', help='season of the CSV rows, or seasons to read from the database')
+    parser.add_argument('--top', type=int, default=10, help='leaders to keep per season (0 to disable)')
+    parser.add_argument('--output', help='write every scored player to this CSV file')
+    parser.add_argument('--chunk-rows', type=int, default=STREAM_CHUNK_ROWS, help='rows read per chunk')
+    parser.add_argument('--encoding', default='utf-8', help='CSV file encoding')
+    parser.add_argument('--compact', action='store_true', help='use the float32 criteria matrix')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    top_k = args.top or None
+    if top_k is None and not args.output:
+        print("Error: nothing to do, use --top or --output")
+        return 1
+
+    if args.csv:
+        if args.season and len(args.season) > 1:
+            print("Error: a CSV file holds a single season")
+            return 1
+        season = args.season[0] if args.season else None
+        source = csv_chunk_source(args.csv, season, args.chunk_rows, args.encoding)
+    else:
+        source = db_chunk_source(args.season or None, args.chunk_rows)
+
+    sink = csv_sink(args.output) if args.output else None
+    try:
+        leaders = MVPCalculator(compact=args.compact).calculate_mvp_scores_streaming(source, top_k=top_k, sink=sink)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.output:
+        print(f"✓ Scores written to {args.output}")
+    if leaders is not None:
+        if leaders.empty:
+            print("No players passed the COPRAS filter")
+        for row in leaders.itertuples():
+            season = f"{int(row.season)} " if 'season' in leaders.columns else ''
+            print(f"{season}#{row.rank_position:<4} {row.A:<30} {row.team:<6} {row.final_score:.6f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the asynchronous audit log writer: batching, flushing and draining on close
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+
+from audit_log import AuditLogWriter
+from conftest import make_temp_database, remove_temp_database
+
+ACTIVITY_TABLE = '''
+    CREATE TABLE user_activity (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        action_type TEXT NOT NULL,
+        action_details TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def activity_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT user_id, action_type, action_details, timestamp FROM user_activity ORDER BY id').fetchall()
+    finally:
+        conn.close()
+
+
+def test_flush_writes_queued_events():
+    """Events are written in order, with the time they were logged"""
+    path = make_temp_database(ACTIVITY_TABLE)
+    writer = AuditLogWriter(path, flush_interval=60, batch_size=3)
+    try:
+        for i in range(7):
+            writer.log(1, 'login', f'event {i}', '127.0.0.1', 'pytest')
+        writer.flush()
+
+        rows = activity_rows(path)
+        assert [row[2] for row in rows] == [f'event {i}' for i in range(7)]
+        assert all(len(row[3]) == len('2024-01-01 00:00:00') for row in rows)
+    finally:
+        writer.close()
+        remove_temp_database(path)
+
+
+def test_close_drains_the_queue():
+    """close() writes every pending event before the thread stops"""
+    path = make_temp_database(ACTIVITY_TABLE)
+    writer = AuditLogWriter(path, flush_interval=60)
+    try:
+        for i in range(50):
+            writer.log(2, 'upload', str(i))
+        writer.close()
+
+        assert len(activity_rows(path)) == 50
+        assert writer._thread is None
+    finally:
+        remove_temp_database(path)
+
+
+def test_unwritable_database_never_blocks():
+    """A database that cannot be opened drops events instead of blocking callers"""
+    path = os.path.join(tempfile.gettempdir(), 'missing-dir', 'nba_mvp.db')
+    writer = AuditLogWriter(path, flush_interval=0.01, batch_size=2, max_queue=4)
+    done = threading.Event()
+
+    def log_and_flush():
+        for i in range(20):
+            writer.log(1, 'login', str(i))
+        writer.flush()
+        writer.close()
+        done.set()
+
+    threading.Thread(target=log_and_flush, daemon=True).start()
+    assert done.wait(5), 'audit logging blocked on an unwritable database'
+
+
+def test_failed_batch_is_retried():
+    """A batch that cannot be written is kept for the next flush, up to max_retries writes"""
+    path = make_temp_database()
+    writer = AuditLogWriter(path, flush_interval=60, max_retries=3)
+    try:
+        # No user_activity table yet: every write fails like a locked database
+        for i in range(3):
+            writer.log(1, 'login', str(i))
+        writer.flush()
+        writer.flush()
+
+        conn = sqlite3.connect(path)
+        conn.executescript(ACTIVITY_TABLE)
+        conn.close()
+        writer.log(1, 'login', '3')
+        writer.flush()
+        assert [row[2] for row in activity_rows(path)] == ['0', '1', '2', '3']
+    finally:
+        writer.close()
+        remove_temp_database(path)
+
+
+if __name__ == '__main__':
+    test_flush_writes_queued_events()
+    test_close_drains_the_queue()
+    test_unwritable_database_never_blocks()
+    test_failed_batch_is_retried()
+    print("✓ Audit log tests passed")
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Equivalence tests for the vectorized COPRAS kernel used by MVPCalculator
+"""
+
+import numpy as np
+import pandas as pd
+
+from app import MVPCalculator, COPRA_MVP_WEIGHTS, COPRA_BENEFIT_CRITERIA, COPRA_COST_CRITERIA
+from calculation_utils import (
+    copras_scores_pandas, build_criteria_matrix, SeasonCoprasState,
+    copras_weight_sweep, rank_matrix_descending, weight_grid, weight_samples,
+    normalize_in_place, copras_scores_normalized, rank_descending, SeasonMatrixCache,
+    top_k_descending, RankingResultCache, weight_hash, compact_frame,
+    rank_descending_segmented, top_k_descending_segmented, make_season_frame, CRITERIA
+)
+
+
+def assert_same_rankings(df):
+    """The kernel output must be identical to the original pandas path"""
+    expected = copras_scores_pandas(df, COPRA_MVP_WEIGHTS, COPRA_BENEFIT_CRITERIA, COPRA_COST_CRITERIA)
+    actual = MVPCalculator().calculate_mvp_scores(df)
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+    if len(expected):
+        assert (actual['final_score'].to_numpy() == expected['final_score'].to_numpy()).all()
+        assert (actual['rank_position'].to_numpy() == expected['rank_position'].to_numpy()).all()
+        assert (actual['id'].to_numpy() == expected['id'].to_numpy()).all()
+
+
+def test_kernel_matches_pandas_path():
+    """Random season data produces the same Qi, order and ranks"""
+    for seed in range(5):
+        assert_same_rankings(make_season_frame(2000, seed=seed))
+
+
+def test_kernel_filter_mask_and_ties():
+    """Filtered rows, duplicated rows (ties) and non-numeric cells behave the same"""
+    df = make_season_frame(300, seed=7)
+    df.loc[::10, 'C7'] = 0.0            # dropped by the 1e-6 filter mask
+    df = pd.concat([df, df.iloc[:40]], ignore_index=True)  # exact ties
+    df['C3'] = df['C3'].astype(object)
+    df.loc[5, 'C3'] = 'n/a'             # coerced to 0 and filtered
+    df.loc[6, 'C10'] = np.nan
+    assert_same_rankings(df)
+
+
+def test_tie_order_is_pinned():
+    """Tied players keep their row order with shared 'min' ranks in the kernel and the reference"""
+    df = make_season_frame(4, seed=21)
+    df = pd.concat([df, df.iloc[[2, 0]]], ignore_index=True)  # ids 5 and 6 tie with 3 and 1
+    df['id'] = range(1, 7)
+    expected_ids = [1, 6, 2, 3, 5, 4]
+    expected_ranks = [1, 1, 3, 4, 4, 6]
+
+    for ranked in (MVPCalculator().calculate_mvp_scores(df),
+                   copras_scores_pandas(df, COPRA_MVP_WEIGHTS, COPRA_BENEFIT_CRITERIA, COPRA_COST_CRITERIA)):
+        assert ranked['id'].tolist() == expected_ids
+        assert ranked['rank_position'].tolist() == expected_ranks
+
+
+def test_kernel_all_filtered():
+    """A zero-total criterion filters every player and returns an empty frame"""
+    df = make_season_frame(50)
+    df['C9'] = 0.0
+    assert_same_rankings(df)
+    assert MVPCalculator().calculate_mvp_scores(df).empty
+
+
+def test_batch_matches_single_season():
+    """Batch ranking of several seasons equals ranking each season on its own"""
+    seasons = []
+    for i, season in enumerate([2021, 2022, 2023, 2024]):
+        season_df = make_season_frame(200 + 50 * i, seed=season)
+        season_df['id'] += 10000 * i
+        season_df['season'] = season
+        season_df.loc[::17, 'C8'] = 0.0
+        seasons.append(season_df)
+    all_df = pd.concat(seasons[::-1], ignore_index=True)
+
+    calculator = MVPCalculator()
+    batch = calculator.calculate_mvp_scores_batch(all_df)
+    assert list(batch['season'].unique()) == [2021, 2022, 2023, 2024]
+
+    for season_df in seasons:
+        expected = calculator.calculate_mvp_scores(season_df).set_index('id')
+        actual = batch[batch['season'] == season_df['season'].iloc[0]].set_index('id')
+        assert len(actual) == len(expected)
+        actual = actual.loc[expected.index]
+        assert (actual['final_score'] == expected['final_score']).all()
+        assert (actual['rank_position'] == expected['rank_position']).all()
+
+
+def test_cached_season_state_matches_full_recalculation():
+    """Inserted, updated and deleted rows in the cached matrix give the same ranking as a fresh run"""
+    calculator = MVPCalculator()
+    df = make_season_frame(500, seed=3)
+    extra = make_season_frame(20, seed=4)
+    extra['id'] += 1000
+
+    def new_state(frame):
+        return SeasonCoprasState(
+            frame['id'].to_numpy(), build_criteria_matrix(frame, calculator.all_criteria),
+            calculator.weight_vector(), len(calculator.benefit_criteria)
+        )
+
+    state = new_state(df)
+    state.upsert(extra['id'].to_numpy(), build_criteria_matrix(extra, calculator.all_criteria))
+    corrected = df.iloc[:5].copy()
+    corrected['C4'] *= 1.1
+    state.upsert(corrected['id'].to_numpy(), build_criteria_matrix(corrected, calculator.all_criteria))
+    state.delete(df['id'].iloc[10:15].to_numpy())
+    state.score()
+
+    final_df = pd.concat([corrected, df.iloc[5:10], df.iloc[15:], extra], ignore_index=True)
+    expected = calculator.calculate_mvp_scores(final_df).set_index('id')
+    # Stored scores must be exactly what a fresh /calculate_mvp run writes
+    assert list(state.results.index) == list(expected.index)
+    assert (state.results['final_score'].to_numpy() == expected['final_score'].to_numpy()).all()
+    assert (state.results['rank_position'].to_numpy() == expected['rank_position'].to_numpy()).all()
+
+
+def test_weight_sweep_matches_calculator():
+    """Each column of a weight sweep ranks players like a calculator run with those weights"""
+    calculator = MVPCalculator()
+    df = make_season_frame(400, seed=11)
+    weight_matrix = weight_samples(calculator.weight_vector(), 8, 0.3, seed=5)
+
+    qi = copras_weight_sweep(build_criteria_matrix(df, calculator.all_criteria),
+                             weight_matrix, len(calculator.benefit_criteria))
+    ranks = rank_matrix_descending(qi)
+
+    for k in range(weight_matrix.shape[1]):
+        weights = dict(zip(calculator.all_criteria, weight_matrix[:, k]))
+        expected = MVPCalculator(weights=weights).calculate_mvp_scores(df)
+        column = pd.Series(ranks[:, k], index=df['id'])
+        assert column.notna().sum() == len(expected)
+        assert (column.loc[expected['id']].to_numpy() == expected['rank_position'].to_numpy()).all()
+
+
+def test_weight_grid_shape():
+    """A grid over two criteria yields the cartesian product of scale factors"""
+    calculator = MVPCalculator()
+    grid = weight_grid(calculator.weight_vector(), calculator.all_criteria, {'C4': [0.5, 1, 2], 'C9': [1, 3]})
+    assert grid.shape == (11, 6)
+    assert sorted(set(np.round(grid[3] / COPRA_MVP_WEIGHTS['C4'], 6))) == [0.5, 1, 2]
+    assert (grid[0] == COPRA_MVP_WEIGHTS['C1']).all()
+
+
+def test_cached_normalized_matrix_matches_calculator():
+    """Scoring a cached normalized matrix with new weights equals a full calculator run"""
+    df = make_season_frame(600, seed=13)
+    df.loc[::9, 'C6'] = 0.0
+    base = MVPCalculator()
+    normalized = normalize_in_place(build_criteria_matrix(df, base.all_criteria))
+    normalized.setflags(write=False)
+
+    for scale in (1.0, 2.5, 0.2):
+        weights = {**COPRA_MVP_WEIGHTS, 'C4': COPRA_MVP_WEIGHTS['C4'] * scale}
+        calculator = MVPCalculator(weights=weights)
+        kept_idx, qi = copras_scores_normalized(normalized, calculator.weight_vector(),
+                                                len(calculator.benefit_criteria))
+        order, ranks = rank_descending(qi)
+        expected = calculator.calculate_mvp_scores(df)
+        assert (df['id'].to_numpy()[kept_idx[order]] == expected['id'].to_numpy()).all()
+        assert (qi[order] == expected['final_score'].to_numpy()).all()
+        assert (ranks == expected['rank_position'].to_numpy()).all()
+
+
+def test_season_matrix_cache_versions_and_eviction():
+    """A new data version is a miss and the least recently used season is evicted"""
+    cache = SeasonMatrixCache(max_seasons=2)
+    cache.put(2022, 1, 'players-2022', np.zeros((2, 2)))
+    cache.put(2023, 1, 'players-2023', np.zeros((2, 2)))
+    assert cache.get(2022, 1)[0] == 'players-2022'
+    assert cache.get(2022, 2) is None
+
+    cache.put(2024, 1, 'players-2024', np.zeros((2, 2)))
+    assert cache.get(2023, 1) is None
+    assert cache.get(2022, 1) is not None
+
+    cache.invalidate(2022)
+    assert cache.get(2022, 1) is None
+
+
+def test_ranking_result_cache_keys_and_invalidation():
+    """Changed weights or data versions miss; invalidation only drops one season"""
+    cache = RankingResultCache(max_entries=3)
+    base = MVPCalculator().weight_vector()
+    changed = base.copy()
+    changed[0] += 0.01
+    assert weight_hash(base) == weight_hash(base.copy()) != weight_hash(changed)
+
+    cache.put((2023, 1, weight_hash(base), 'copras'), 480)
+    cache.put((2024, 1, weight_hash(base), 'copras'), 500)
+    assert cache.get((2023, 1, weight_hash(base), 'copras')) == 480
+    assert cache.get((2023, 2, weight_hash(base), 'copras')) is None
+    assert cache.get((2023, 1, weight_hash(changed), 'copras')) is None
+
+    cache.invalidate(2023)
+    assert cache.get((2023, 1, weight_hash(base), 'copras')) is None
+    assert cache.get((2024, 1, weight_hash(base), 'copras')) == 500
+
+    for version in range(2, 5):
+        cache.put((2024, version, weight_hash(base), 'copras'), 500)
+    assert cache.get((2024, 1, weight_hash(base), 'copras')) is None
+
+
+def test_top_k_matches_full_ranking():
+    """Top-K selection returns the leaders with the same scores and ranks as a full sort"""
+    calculator = MVPCalculator()
+    df = make_season_frame(1000, seed=17)
+    df = pd.concat([df, df.iloc[:30]], ignore_index=True)  # ties around the cut-off
+    full = calculator.calculate_mvp_scores(df)
+
+    for k in (1, 10, 25, 5000):
+        top = calculator.calculate_mvp_scores(df, top_k=k)
+        expected = full[full['rank_position'] <= k]
+        assert len(top) == len(expected) >= min(k, len(full))
+        assert (top['final_score'].to_numpy() == expected['final_score'].to_numpy()).all()
+        assert (top['rank_position'].to_numpy() == expected['rank_position'].to_numpy()).all()
+        assert (top['id'].to_numpy() == expected['id'].to_numpy()).all()
+
+
+def test_top_k_keeps_ties_at_cut_off():
+    """Every score tied with the k-th best is kept and shares its rank"""
+    order, ranks = top_k_descending(np.array([0.1, 0.5, 0.3, 0.5, 0.3, 0.3, 0.2]), 3)
+    assert order.tolist() == [1, 3, 2, 4, 5]
+    assert ranks.tolist() == [1, 1, 3, 3, 3]
+
+
+def test_ties_keep_row_order_in_every_path():
+    """Full, segmented, top-K and sweep rankings order tied Qi by row with 'min' ranks"""
+    scores = np.array([0.3, 0.5, 0.3, 0.5, 0.1, 0.3] * 50)
+    order, ranks = rank_descending(scores)
+    expected_order = np.argsort(-scores, kind='stable')
+    assert order[:4].tolist() == [1, 3, 7, 9]
+    assert (order == expected_order).all()
+
+    segments = np.zeros(len(scores), dtype=np.intp)
+    for other_order, other_ranks in (rank_descending_segmented(scores, segments),
+                                     top_k_descending(scores, len(scores) - 1),
+                                     top_k_descending_segmented(scores, segments, len(scores) - 1)):
+        assert (other_order == order).all()
+        assert (other_ranks == ranks).all()
+
+    top_order, top_ranks = top_k_descending(scores, 60)
+    assert (top_order == order[:100]).all()
+    assert (top_ranks == ranks[:100]).all()
+
+    swept = rank_matrix_descending(scores[:, None])[:, 0]
+    assert (swept[order] == ranks).all()
+
+
+def test_batch_top_k_per_season():
+    """Batch top-K keeps the leaders of each season separately"""
+    seasons = []
+    for i, season in enumerate([2022, 2023]):
+        season_df = make_season_frame(300, seed=season)
+        season_df['id'] += 10000 * i
+        season_df['season'] = season
+        seasons.append(season_df)
+    all_df = pd.concat(seasons, ignore_index=True)
+
+    calculator = MVPCalculator()
+    full = calculator.calculate_mvp_scores_batch(all_df)
+    top = calculator.calculate_mvp_scores_batch(all_df, top_k=5)
+    expected = full[full['rank_position'] <= 5]
+    assert (top['id'].to_numpy() == expected['id'].to_numpy()).all()
+    assert (top['rank_position'].to_numpy() == expected['rank_position'].to_numpy()).all()
+
+
+def test_compact_mode_matches_default_ranking():
+    """The float32 compact mode ranks players like the float64 path"""
+    df = make_season_frame(3000, seed=23)
+    df['season'] = np.repeat([2022, 2023, 2024], 1000)
+    expected = MVPCalculator().calculate_mvp_scores_batch(df)
+
+    compact = compact_frame(df.copy(), CRITERIA)
+    assert compact['id'].dtype == np.int32 and compact['team'].dtype == 'category'
+    actual = MVPCalculator(compact=True).calculate_mvp_scores_batch(compact)
+
+    assert list(actual.columns) == ['id', 'A', 'team', 'season', 'final_score', 'rank_position']
+    assert (actual['id'].to_numpy() == expected['id'].to_numpy()).all()
+    assert (actual['rank_position'].to_numpy() == expected['rank_position'].to_numpy()).all()
+    assert np.allclose(actual['final_score'], expected['final_score'], rtol=1e-4)
+
+
+def test_streaming_matches_in_memory_scores():
+    """Chunked three-pass scoring gives the same Qi and leaders as the batch path"""
+    df = make_season_frame(6000, seed=29)
+    df['season'] = np.repeat([2023, 2024], 3000)
+    df.loc[::13, 'C4'] = 0.0
+    calculator = MVPCalculator()
+    expected = calculator.calculate_mvp_scores_batch(df)
+
+    def chunk_source():
+        return (df.iloc[start:start + 700] for start in range(0, len(df), 700))
+
+    scored = []
+    leaders = calculator.calculate_mvp_scores_streaming(chunk_source, top_k=10, sink=scored.append)
+
+    scored = pd.concat(scored).set_index('id').loc[expected['id']]
+    assert len(scored) == len(expected)
+    assert (scored['final_score'].to_numpy() == expected['final_score'].to_numpy()).all()
+
+    top = expected[expected['rank_position'] <= 10]
+    assert (leaders['season'].to_numpy() == top['season'].to_numpy()).all()
+    assert (leaders['final_score'].to_numpy() == top['final_score'].to_numpy()).all()
+    assert (leaders['rank_position'].to_numpy() == top['rank_position'].to_numpy()).all()
+
+
+if __name__ == '__main__':
+    test_kernel_matches_pandas_path()
+    test_kernel_filter_mask_and_ties()
+    test_kernel_all_filtered()
+    print("✓ COPRAS kernel matches the pandas path")
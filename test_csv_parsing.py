@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for the sniffed single-pass CSV upload parser and the chunked upload stream
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app import (CsvUploadStream, count_csv_rows, find_invalid_upload_rows, parse_csv_upload,
+                 player_name_keys, sniff_csv_format, statistics_row_hashes)
+
+COLUMNS = ['A', 'Team'] + [f'C{i}' for i in range(1, 12)]
+
+
+def make_upload_frame(n_rows=50):
+    """Create an upload frame in the strict 'A', 'Team', C1-C11 format"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame((rng.random((n_rows, 11)) * 30 + 1).round(2), columns=COLUMNS[2:])
+    df.insert(0, 'Team', [f'Team {i % 30}' for i in range(n_rows)])
+    df.insert(0, 'A', [f'José {i}' for i in range(n_rows)])
+    return df
+
+
+def write_temp_csv(write):
+    """Write a CSV with the given callable and return its path"""
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    write(path)
+    return path
+
+
+def test_sniffs_encoding_and_delimiter():
+    """Semicolon, cp1252 and BOM-prefixed files are detected and parsed in one read"""
+    df = make_upload_frame()
+    cases = [
+        ({'sep': ','}, ('utf-8', ',')),
+        ({'sep': ';', 'encoding': 'cp1252'}, ('cp1252', ';')),
+        ({'sep': ',', 'encoding': 'utf-8-sig'}, ('utf-8-sig', ',')),
+    ]
+    for options, expected in cases:
+        path = write_temp_csv(lambda p: df.to_csv(p, index=False, **options))
+        try:
+            assert sniff_csv_format(path) == expected
+            parsed, message = parse_csv_upload(path)
+            assert parsed is not None, message
+            assert list(parsed.columns) == COLUMNS
+            assert len(parsed) == len(df)
+            assert parsed['C4'].dtype == np.float64
+        finally:
+            os.remove(path)
+
+
+def test_reports_skipped_lines():
+    """Malformed lines are skipped and reported instead of failing the upload"""
+    def write(path):
+        make_upload_frame(10).to_csv(path, index=False)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('Broken Row,Team X,' + ','.join(['1'] * 14) + '\n')
+
+    path = write_temp_csv(write)
+    try:
+        parsed, message = parse_csv_upload(path)
+        assert len(parsed) == 10
+        assert len(parsed.attrs['skipped_lines']) == 1
+        assert parsed.attrs['skipped_lines'][0][0] == 'Broken Row'
+        assert 'Skipped 1 malformed lines' in message
+    finally:
+        os.remove(path)
+
+
+def test_empty_file_is_rejected():
+    """An empty upload returns an error message"""
+    path = write_temp_csv(lambda p: open(p, 'w').close())
+    try:
+        parsed, message = parse_csv_upload(path)
+        assert parsed is None and 'empty' in message
+    finally:
+        os.remove(path)
+
+
+def test_stream_reads_in_chunks():
+    """The upload stream yields bounded chunks and restarts past a malformed line"""
+    def write(path):
+        df = make_upload_frame(250)
+        df.iloc[:180].to_csv(path, index=False)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('Broken Row,Team X,' + ','.join(['1'] * 14) + '\n')
+        df.iloc[180:].to_csv(path, index=False, header=False, mode='a')
+
+    path = write_temp_csv(write)
+    try:
+        stream = CsvUploadStream(path, chunk_rows=64)
+        assert stream.validate() == (True, "CSV format is valid.")
+        chunks = list(stream)
+        assert max(len(chunk) for chunk in chunks) <= 64
+        parsed = pd.concat(chunks)
+        assert len(parsed) == 250
+        assert parsed['A'].tolist() == make_upload_frame(250)['A'].tolist()
+        assert parsed['C11'].dtype == np.float64
+        assert [fields[0] for fields in stream.skipped_lines] == ['Broken Row']
+        assert count_csv_rows(path) == 251
+    finally:
+        os.remove(path)
+
+
+def test_invalid_rows_are_rejected_with_reasons():
+    """Null names, non-numeric cells, negative counts and percentages over 100 are rejected"""
+    df = make_upload_frame(6).astype({'C3': object, 'C8': object})
+    df.loc[1, 'A'] = None
+    df.loc[2, 'C8'] = 'n/a'
+    df.loc[3, 'C1'] = -3
+    df.loc[3, 'C3'] = 152.0
+    df.loc[4, 'C10'] = np.nan  # Missing cells are stored as 0, not rejected
+
+    reasons, rejected = find_invalid_upload_rows(df)
+    assert reasons.to_dict() == {
+        1: 'missing player name',
+        2: 'C8 is not numeric',
+        3: 'C1 is negative; C3 is above 100',
+    }
+    assert rejected.loc[2, 'C8'] == 'n/a'
+    assert df['C8'].dtype == np.float64 and np.isnan(df.loc[2, 'C8'])
+
+
+def test_player_keys_and_row_hashes():
+    """Name keys ignore case and spacing; row hashes change only with the statistics"""
+    keys = player_name_keys(pd.Series(['LeBron  James', ' lebron james ', 'José Calderón'], dtype='string'))
+    assert keys.tolist() == ['lebron james', 'lebron james', 'josé calderón']
+
+    stats = make_upload_frame(4)[COLUMNS[2:]]
+    changed = stats.copy()
+    changed.iloc[2, 5] += 1
+    missing = stats.copy()
+    missing.iloc[1, 0] = np.nan
+
+    hashes = statistics_row_hashes(stats)
+    assert hashes.dtype == np.int64
+    assert (hashes == statistics_row_hashes(stats.copy())).all()
+    assert (hashes != statistics_row_hashes(changed)).tolist() == [False, False, True, False]
+    missing_as_zero = stats.copy()
+    missing_as_zero.iloc[1, 0] = 0.0
+    assert (statistics_row_hashes(missing) == statistics_row_hashes(missing_as_zero)).all()
+
+
+if __name__ == '__main__':
+    test_sniffs_encoding_and_delimiter()
+    test_reports_skipped_lines()
+    test_empty_file_is_rejected()
+    test_stream_reads_in_chunks()
+    test_invalid_rows_are_rejected_with_reasons()
+    test_player_keys_and_row_hashes()
+    print("✓ CSV parsing tests passed")
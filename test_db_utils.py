@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for configured SQLite connections: pragmas and read-only readers
+"""
+
+import sqlite3
+
+from conftest import make_temp_database, remove_temp_database
+from db_utils import ConnectionPool, connect_db
+
+PLAYERS_TABLE = '''
+    CREATE TABLE players (id INTEGER PRIMARY KEY, name TEXT);
+    INSERT INTO players (name) VALUES ('Nikola Jokic');
+'''
+
+
+def test_reader_cannot_write():
+    """Read-only connections reject writes but see committed data"""
+    path = make_temp_database(PLAYERS_TABLE, connect=connect_db)
+    reader = connect_db(path, read_only=True)
+    try:
+        assert reader.execute('PRAGMA query_only').fetchone()[0] == 1
+        assert reader.execute('SELECT name FROM players').fetchall() == [('Nikola Jokic',)]
+        try:
+            reader.execute("INSERT INTO players (name) VALUES ('Luka Doncic')")
+            assert False, 'write on a read-only connection succeeded'
+        except sqlite3.OperationalError:
+            pass
+    finally:
+        reader.close()
+        remove_temp_database(path)
+
+
+def test_readers_run_during_a_write_transaction():
+    """Under WAL a pooled reader is not blocked by an open write transaction"""
+    path = make_temp_database(PLAYERS_TABLE, connect=connect_db)
+    writer = connect_db(path)
+    readers = ConnectionPool(path, read_only=True)
+    try:
+        assert writer.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute("INSERT INTO players (name) VALUES ('Luka Doncic')")
+
+        reader = readers.acquire()
+        assert reader.execute('SELECT COUNT(*) FROM players').fetchone()[0] == 1
+        writer.commit()
+        assert reader.execute('SELECT COUNT(*) FROM players').fetchone()[0] == 2
+
+        readers.release(reader)
+        assert readers.acquire() is reader
+        reader.close()
+    finally:
+        writer.close()
+        remove_temp_database(path)
+
+
+if __name__ == '__main__':
+    test_reader_cannot_write()
+    test_readers_run_during_a_write_transaction()
+    print("✓ Database connection tests passed")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable SQLite job queue: leasing, heartbeats and retries
+"""
+
+import time
+
+from conftest import make_temp_database, remove_temp_database
+from job_queue import JobQueue, JobWorker, PermanentJobError, init_jobs_table
+
+
+def make_queue(**options):
+    """Create a queue backed by a temporary database"""
+    path = make_temp_database(init_jobs_table)
+    return JobQueue(path, **options), path
+
+
+def test_claim_heartbeat_complete():
+    """A claimed job is leased to one worker until it completes"""
+    queue, path = make_queue()
+    try:
+        job_id = queue.enqueue('export', {'season': 2024})
+        job = queue.claim('worker-a')
+        assert job['id'] == job_id and job['payload'] == {'season': 2024}
+        assert job['status'] == 'running' and job['attempts'] == 1
+        assert queue.claim('worker-b') is None
+
+        assert queue.heartbeat(job_id, 'worker-a')
+        assert not queue.heartbeat(job_id, 'worker-b')
+
+        queue.complete(job_id, 'worker-a', {'rows': 3})
+        job = queue.get(job_id)
+        assert job['status'] == 'completed' and job['result'] == {'rows': 3}
+    finally:
+        remove_temp_database(path)
+
+
+def test_expired_lease_is_reclaimed():
+    """A job whose worker stopped sending heartbeats is claimed again"""
+    queue, path = make_queue(lease_seconds=0)
+    try:
+        job_id = queue.enqueue('ingest', max_attempts=2)
+        assert queue.claim('worker-a')['id'] == job_id
+        time.sleep(0.01)
+
+        job = queue.claim('worker-b')
+        assert job['id'] == job_id and job['attempts'] == 2 and job['worker_id'] == 'worker-b'
+
+        # The final attempt expiring too fails the job instead of looping
+        time.sleep(0.01)
+        assert queue.claim('worker-c') is None
+        assert queue.get(job_id)['status'] == 'failed'
+    finally:
+        remove_temp_database(path)
+
+
+def test_worker_retries_failed_jobs():
+    """Handler errors requeue the job until max_attempts is reached"""
+    queue, path = make_queue(retry_backoff_seconds=0)
+    calls = []
+
+    def flaky(payload, job):
+        calls.append(job['attempts'])
+        if job['attempts'] < 2:
+            raise RuntimeError('database is locked')
+        return {'attempt': job['attempts']}
+
+    def broken(payload, job):
+        raise ValueError('bad payload')
+
+    try:
+        flaky_id = queue.enqueue('flaky', max_attempts=3)
+        broken_id = queue.enqueue('broken', max_attempts=2)
+        JobWorker(queue, {'flaky': flaky, 'broken': broken}, poll_interval=0).run(once=True)
+
+        assert calls == [1, 2]
+        assert queue.get(flaky_id)['result'] == {'attempt': 2}
+        broken_job = queue.get(broken_id)
+        assert broken_job['status'] == 'failed' and broken_job['attempts'] == 2
+        assert broken_job['last_error'] == 'bad payload'
+    finally:
+        remove_temp_database(path)
+
+
+def test_run_once_waits_for_retry_backoff():
+    """A drain with once=True also runs jobs that are waiting to be retried"""
+    queue, path = make_queue(retry_backoff_seconds=0.05)
+    calls = []
+
+    def flaky(payload, job):
+        calls.append(job['attempts'])
+        if job['attempts'] < 2:
+            raise RuntimeError('database is locked')
+        return {'attempt': job['attempts']}
+
+    try:
+        job_id = queue.enqueue('flaky', max_attempts=3)
+        JobWorker(queue, {'flaky': flaky}, poll_interval=0.01).run(once=True)
+
+        assert calls == [1, 2]
+        assert queue.get(job_id)['status'] == 'completed'
+        assert queue.next_run_after() is None
+    finally:
+        remove_temp_database(path)
+
+
+def test_permanent_errors_are_not_retried():
+    """PermanentJobError fails the job on its first attempt"""
+    queue, path = make_queue(retry_backoff_seconds=0)
+    calls = []
+
+    def unencodable(payload, job):
+        calls.append(job['attempts'])
+        raise PermanentJobError('name cannot be encoded')
+
+    try:
+        job_id = queue.enqueue('export', max_attempts=3)
+        JobWorker(queue, {'export': unencodable}, poll_interval=0).run(once=True)
+
+        assert calls == [1]
+        job = queue.get(job_id)
+        assert job['status'] == 'failed' and job['last_error'] == 'name cannot be encoded'
+    finally:
+        remove_temp_database(path)
+
+
+if __name__ == '__main__':
+    test_claim_heartbeat_complete()
+    test_expired_lease_is_reclaimed()
+    test_worker_retries_failed_jobs()
+    test_run_once_waits_for_retry_backoff()
+    test_permanent_errors_are_not_retried()
+    print("✓ Job queue tests passed")
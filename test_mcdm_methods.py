@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the MCDM method registry sharing one decision matrix
+"""
+
+import numpy as np
+
+from app import MVPCalculator
+from calculation_utils import (MCDM_METHODS, score_methods, borda_consensus, saw_scores, vikor_scores,
+                               waspas_scores, make_season_frame)
+
+
+def test_registry_copras_matches_calculator():
+    """The registered COPRAS method gives the same Qi and ranks as MVPCalculator"""
+    df = make_season_frame(500, seed=21)
+    df.loc[::12, 'C5'] = 0.0
+    calculator = MVPCalculator()
+
+    results = calculator.calculate_method_scores(df, ['copras'], consensus=False)
+    expected = calculator.calculate_mvp_scores(df)
+    assert (results['score'].to_numpy() == expected['final_score'].to_numpy()).all()
+    assert (results['rank_position'].to_numpy() == expected['rank_position'].to_numpy()).all()
+    assert set(results['id']) == set(expected['id'])
+
+
+def test_all_methods_rank_every_player():
+    """Every method ranks each player once and the Borda consensus is added"""
+    df = make_season_frame(200, seed=22)
+    results = MVPCalculator().calculate_method_scores(df)
+    assert list(results['method'].unique()) == list(MCDM_METHODS) + ['borda']
+    assert (results.groupby('method')['id'].nunique() == 200).all()
+    assert not results['score'].isna().any()
+
+
+def test_method_scores_on_small_matrix():
+    """SAW and VIKOR agree with hand-computed values; a dominant player wins everywhere"""
+    matrix = np.array([[10.0, 4.0, 1.0],
+                       [5.0, 2.0, 2.0],
+                       [8.0, 3.0, 4.0]])
+    weights = np.array([0.5, 0.3, 0.2])
+
+    assert np.allclose(saw_scores(matrix, weights, 2), [1.0, 0.5 * 0.5 + 0.3 * 0.5 + 0.2 * 2 / 3,
+                                                        0.5 * 0.8 + 0.3 * 0.75 + 0.2 * 0.0])
+    assert vikor_scores(matrix, weights, 2)[0] == 0.0
+
+    scores, ranks = score_methods(matrix, weights, 2, list(MCDM_METHODS))
+    assert (ranks[0] == 1).all()
+    points, consensus = borda_consensus(ranks)
+    assert consensus.tolist() == [1.0, 3.0, 2.0]
+
+
+def test_zero_cost_values_keep_their_weight():
+    """Players with 0 turnovers or fouls do not zero the cost columns for SAW and WASPAS"""
+    matrix = np.array([[10.0, 0.0, 3.0],
+                       [10.0, 2.0, 0.0],
+                       [10.0, 4.0, 1.5]])
+    weights = np.array([0.4, 0.3, 0.3])
+
+    saw = saw_scores(matrix, weights, 1)
+    assert np.allclose(saw, [0.4 + 0.3 * 1.0 + 0.3 * 0.0,
+                             0.4 + 0.3 * 0.5 + 0.3 * 1.0,
+                             0.4 + 0.3 * 0.0 + 0.3 * 0.5])
+    assert saw.argmax() == 1
+
+    # The product model still separates players instead of being 0 for everyone
+    waspas = waspas_scores(matrix, weights, 1)
+    assert (waspas > 0.5 * saw).all()
+    assert waspas.argmax() == 1
+
+
+def test_borda_skips_unranked_players():
+    """Players a method filters out earn no points from that method"""
+    ranks = np.array([[1.0, 2.0],
+                      [2.0, np.nan],
+                      [np.nan, 1.0],
+                      [np.nan, np.nan]])
+    points, consensus = borda_consensus(ranks)
+    assert points[:3].tolist() == [1.0, 0.0, 1.0]
+    assert np.isnan(points[3]) and np.isnan(consensus[3])
+    assert consensus[:3].tolist() == [1.0, 3.0, 1.0]
+
+
+if __name__ == '__main__':
+    test_registry_copras_matches_calculator()
+    test_all_methods_rank_every_player()
+    test_method_scores_on_small_matrix()
+    test_zero_cost_values_keep_their_weight()
+    test_borda_skips_unranked_players()
+    print("✓ MCDM method registry tests passed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned schema migrations: fresh databases, databases
+created before versioning and repeated runs
+"""
+
+import sqlite3
+
+from app import SCHEMA_MIGRATIONS
+from conftest import make_temp_database, remove_temp_database
+from migrations import migrate, schema_version, table_columns
+
+LATEST_VERSION = max(version for version, _, _ in SCHEMA_MIGRATIONS)
+
+
+def index_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_fresh_database_reaches_latest_version():
+    """Every migration runs once on an empty database"""
+    path = make_temp_database()
+    conn = sqlite3.connect(path)
+    try:
+        assert migrate(conn, SCHEMA_MIGRATIONS) == list(range(1, LATEST_VERSION + 1))
+        assert schema_version(conn) == LATEST_VERSION
+        assert migrate(conn, SCHEMA_MIGRATIONS) == []
+
+        cursor = conn.cursor()
+        assert {'name_key', 'row_hash'} <= set(table_columns(cursor, 'players'))
+        assert {'rejected_rows', 'content_sha256', 'season'} <= set(table_columns(cursor, 'file_uploads'))
+        assert {'idx_players_season', 'idx_statistics_player_id', 'idx_mvp_scores_season_rank',
+                'idx_mvp_scores_player_id', 'idx_user_sessions_user_active',
+                'idx_user_activity_timestamp'} <= index_names(conn)
+
+        plan = ' '.join(row[3] for row in conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT p.name FROM players p JOIN mvp_scores mvp ON p.id = mvp.player_id
+            WHERE p.season = ? AND mvp.season = ? ORDER BY mvp.rank_position LIMIT 10
+        ''', (2024, 2024)))
+        assert 'USING INDEX idx_mvp_scores_season_rank' in plan
+    finally:
+        conn.close()
+        remove_temp_database(path)
+
+
+def test_unversioned_database_is_upgraded():
+    """A pre-versioning database gets its missing columns, keys and indexes"""
+    path = make_temp_database()
+    conn = sqlite3.connect(path)
+    try:
+        # The players/statistics schema and file storage index of older releases
+        conn.executescript('''
+            CREATE TABLE players (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, team TEXT NOT NULL,
+                season INTEGER NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE statistics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, player_id INTEGER, games REAL, minutes REAL,
+                fg_percent REAL, points REAL, rebounds REAL, assists REAL, steals REAL, blocks REAL,
+                team_performance REAL, turnovers REAL, personal_fouls REAL
+            );
+            CREATE TABLE file_uploads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, session_id TEXT,
+                original_filename TEXT NOT NULL, stored_filename TEXT NOT NULL, file_path TEXT NOT NULL,
+                file_size INTEGER, upload_order INTEGER, file_type TEXT DEFAULT 'csv',
+                status TEXT DEFAULT 'uploaded', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                processed_at TIMESTAMP
+            );
+            CREATE INDEX idx_file_uploads_user_id ON file_uploads(user_id);
+            INSERT INTO players (name, team, season) VALUES ('LeBron James', 'LAL', 2024);
+            INSERT INTO players (name, team, season) VALUES ('lebron  JAMES', 'LAL', 2024);
+        ''')
+        conn.commit()
+
+        migrate(conn, SCHEMA_MIGRATIONS)
+        assert schema_version(conn) == LATEST_VERSION
+
+        # Only the newest of the duplicate uploads is keyed
+        keys = conn.execute('SELECT id, name_key FROM players ORDER BY id').fetchall()
+        assert keys == [(1, None), (2, 'lebron james')]
+        indexes = index_names(conn)
+        assert 'idx_players_identity' in indexes and 'idx_file_uploads_user_id' not in indexes
+        assert 'message' in table_columns(conn.cursor(), 'upload_sessions')
+    finally:
+        conn.close()
+        remove_temp_database(path)
+
+
+if __name__ == '__main__':
+    test_fresh_database_reaches_latest_version()
+    test_unversioned_database_is_upgraded()
+    print("✓ Migration tests passed")
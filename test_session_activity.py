@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for coalesced session activity tracking
+"""
+
+import sqlite3
+
+from conftest import make_temp_database, remove_temp_database
+from session_activity import SessionActivityTracker
+
+# One active and one ended session
+SESSIONS_TABLE = '''
+    CREATE TABLE user_sessions (
+        id TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        last_activity TIMESTAMP,
+        is_active BOOLEAN DEFAULT 1
+    );
+    INSERT INTO user_sessions (id, user_id, last_activity, is_active) VALUES ('active', 1, '2024-01-01 00:00:00', 1);
+    INSERT INTO user_sessions (id, user_id, last_activity, is_active) VALUES ('ended', 1, '2024-01-01 00:00:00', 0);
+'''
+
+
+def last_activity(path):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute('SELECT id, last_activity FROM user_sessions'))
+    finally:
+        conn.close()
+
+
+def test_touches_are_coalesced_until_flush():
+    """Repeated touches cost no writes until one bulk flush"""
+    path = make_temp_database(SESSIONS_TABLE)
+    tracker = SessionActivityTracker(path, flush_interval=60)
+    try:
+        for _ in range(100):
+            tracker.touch('active')
+            tracker.touch('ended')
+        assert last_activity(path)['active'] == '2024-01-01 00:00:00'
+
+        assert tracker.flush() == 2
+        activity = last_activity(path)
+        assert activity['active'] > '2024-01-01 00:00:00'
+        # Ended sessions keep their final activity time
+        assert activity['ended'] == '2024-01-01 00:00:00'
+        assert tracker.flush() == 0
+    finally:
+        tracker.close()
+        remove_temp_database(path)
+
+
+def test_discard_and_close():
+    """Discarded sessions are not flushed; close() writes the rest"""
+    path = make_temp_database(SESSIONS_TABLE)
+    tracker = SessionActivityTracker(path, flush_interval=60)
+    try:
+        tracker.touch('active')
+        assert tracker.discard('active') is not None
+        assert tracker.discard('active') is None
+
+        tracker.touch('active')
+        tracker.close()
+        assert last_activity(path)['active'] > '2024-01-01 00:00:00'
+    finally:
+        remove_temp_database(path)
+
+
+if __name__ == '__main__':
+    test_touches_are_coalesced_until_flush()
+    test_discard_and_close()
+    print("✓ Session activity tests passed")